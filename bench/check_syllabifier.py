@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Regression check of the Ukrainian syllabifier.
+
+Compares the splits of ukrsyllab with a frozen reference of (word, syllables)
+pairs that were produced by the original rule engine (every 100th word of
+uk_UA.csv, random strings and edge cases such as apostrophes, hyphens and
+capital letters). Any change to SYLLABER that changes a split makes the check
+fail, so the change has to be deliberate.
+
+    python3 bench/check_syllabifier.py
+
+The reference file has one JSON array ["word", ["syl", "la", "bles"]] per line.
+"""
+import argparse, json, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ukrsyllab
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ukrsyllab_reference.jsonl")
+
+def read_reference(path):
+    """
+    Reads the frozen (word, syllables) pairs
+
+        Parameters
+        ----------
+        path : str
+            name of the reference file
+
+        Returns
+        -------
+        pairs : list
+            the (word, syllables) pairs
+    """
+    with open(path, encoding="utf8") as file:
+        return [tuple(json.loads(line)) for line in file if line.strip()]
+
+def mismatches(pairs):
+    """
+    Splits every word with split, split_word and split_batch and returns the
+    words whose syllables differ from the reference
+
+        Parameters
+        ----------
+        pairs : list
+            the (word, syllables) pairs
+
+        Returns
+        -------
+        failures : list
+            (word, expected, found, function) for every difference
+    """
+    failures = []
+    batch = ukrsyllab.split_batch([word for word, _ in pairs])
+    for i, (word, expected) in enumerate(pairs):
+        batched = [batch.syllables[batch.ids[k]] for k in range(batch.offsets[i], batch.offsets[i + 1])]
+        for function, found in (("split", ukrsyllab.split(word)), ("split_word", ukrsyllab.split_word(word)), ("split_batch", batched)):
+            if found != expected:
+                failures.append((word, expected, found, function))
+    return failures
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compares the Ukrainian syllabifier with the frozen reference splits.")
+    parser.add_argument("-r", "--reference", default=REFERENCE, help="file of the reference pairs (default: bench/ukrsyllab_reference.jsonl)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    pairs = read_reference(args.reference)
+    failures = mismatches(pairs)
+    for word, expected, found, function in failures:
+        print("%s(%r): expected %s, found %s" % (function, word, "|".join(expected), "|".join(found)), file=sys.stderr)
+    print("%d words, %d mismatches" % (len(pairs), len(failures)), file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the Jabberwocky sentence generator.
+
+Times every stage of the pipeline separately (read, lexicon, stem, syllabify,
+count, normalize, pseudowords, categorize, assemble) on corpora of several
+sizes, with
+fixed seeds, and reports the throughput and the peak memory of every stage.
+The results are written as JSON, so that the runs of different commits can be
+compared.
+
+    python3 bench/run_bench.py --sizes 10000,50000,0 --synthetic 20000 --output bench.json
+
+A size of 0 is the whole corpus.
+"""
+import argparse, json, os, platform, random, subprocess, sys, tempfile, time, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ukrsyllab
+import jabberwocky_sentence_generator as jsg
+
+ALPHABET = {"ukrainian": ("бвгґджзклмнпрстфхцчшщ", "аеиіоуяюєї"),
+            "turkish": ("bcçdfgğhjklmnprsştvyz", "aeıioöuü")} #consonants and vowels of the synthetic corpora
+STAGES = ["read", "lexicon", "stem", "syllabify", "count", "normalize", "pseudowords", "categorize", "assemble"]
+
+def synthetic_corpus(path, n, language, seed):
+    """
+    Writes a synthetic database of n random words that are built from
+    consonant-vowel syllables
+
+        Parameters
+        ----------
+        path : str
+            name of the file
+        n : int
+            number of words
+        language : str
+            the language whose letters are used
+        seed : int
+            the seed of the random generator
+
+        Returns
+        -------
+        path : str
+            name of the file
+    """
+    rng = random.Random(seed)
+    consonants, vowels = ALPHABET[language]
+    with open(path, "w", encoding="utf8") as file:
+        for _ in range(n):
+            syllables = [rng.choice(consonants) + rng.choice(vowels) + rng.choice(["", "", rng.choice(consonants)]) for _ in range(rng.randint(2, 4))]
+            file.write("".join(syllables) + "\n")
+    return path
+
+def sliced_corpus(path, source, n):
+    """
+    Writes the first n lines of a database to another file
+
+        Parameters
+        ----------
+        path : str
+            name of the file
+        source : str
+            name of the database
+        n : int
+            number of lines
+
+        Returns
+        -------
+        path : str
+            name of the file
+    """
+    corpus = jsg.Corpus(source)
+    with open(path, "w", encoding="utf8") as file:
+        file.writelines(line + "\n" for line in corpus.lines(0, n))
+    corpus.close()
+    return path
+
+def measure(stage, items, run, setup=None, repeat=3):
+    """
+    Times a stage and measures its peak memory. The stage is timed repeat
+    times without tracing the memory and the best time is kept, then it is run
+    once more with tracemalloc for the peak memory
+
+        Parameters
+        ----------
+        stage : str
+            name of the stage
+        items : int
+            number of items that the stage processes, for the throughput
+        run : function
+            runs the stage, it gets the values returned by setup
+        setup : function, optional
+            prepares the arguments of run, it is not timed
+        repeat : int, optional
+            number of timed runs, the default value is 3
+
+        Returns
+        -------
+        result : object
+            the value returned by the last run
+        record : dict
+            the time, the throughput and the peak memory of the stage
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = run(*args)
+        best = min(best, time.perf_counter() - start)
+    args = setup() if setup else ()
+    tracemalloc.start()
+    result = run(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {"stage": stage,
+                    "items": items,
+                    "seconds": best,
+                    "throughput": items / best if best > 0 else None,
+                    "peak_bytes": peak}
+
+def bench_corpus(cls, path, n_words, n_sent, order, seed, repeat):
+    """
+    Runs all the stages of the pipeline on a database
+
+        Parameters
+        ----------
+        cls : type
+            Turkish_jabberwocky or Ukrainian_jabberwocky
+        path : str
+            name of the database
+        n_words : int
+            number of pseudostems
+        n_sent : int
+            number of sentences
+        order : int
+            the order of the syllable model
+        seed : int
+            the seed of the random generators
+        repeat : int
+            number of timed runs of every stage
+
+        Returns
+        -------
+        records : list
+            a record for every stage
+    """
+    generator = cls(path, n_words, n_sent, order=order, seed=seed)
+    records = []
+    words, record = measure("read", len(generator.words), lambda: list(jsg.Corpus(path)), repeat=repeat)
+    records.append(record)
+    def build_lexicon(): #the exact set of the words for the stems and the Bloom filter for the pseudowords
+        lexicon = jsg.Lexicon(words)
+        lexicon.exact_words()
+        lexicon.build()
+        return lexicon
+    generator.lexicon, record = measure("lexicon", len(words), build_lexicon, repeat=repeat)
+    records.append(record)
+    stems, record = measure("stem", len(words), generator.stem_words, lambda: (words,), repeat)
+    records.append(record)
+    generator.stems = stems
+    def fresh_syllables(): #the memos of the words and the rule matches of the Ukrainian syllabifier are emptied, so every run syllabifies from scratch
+        ukrsyllab._split_cached.cache_clear()
+        ukrsyllab.match.cache_clear()
+        return (stems,)
+    syllables, record = measure("syllabify", len(stems), generator.syllabification, fresh_syllables, repeat)
+    records.append(record)
+    def count(syllables):
+        model = jsg.Transition_model(order)
+        model.add_words(syllables)
+        return model
+    model, record = measure("count", len(stems), count, lambda: (syllables,), repeat)
+    records.append(record)
+    def normalize(model):
+        model.normalize(len(stems))
+        return model
+    model, record = measure("normalize", len(model.syllables), normalize, lambda: (count(syllables),), repeat)
+    records.append(record)
+    generator.model = model
+    def reseed(): #every run samples the same pseudowords
+        generator.rng = random.Random(seed)
+        generator.batch_generator = None
+        return ()
+    pwords, record = measure("pseudowords", n_words, generator.pseudowords, reseed, repeat) #sampling the pseudostems, normalizing, deduplicating and the lexicon checks
+    records.append(record)
+    categories, record = measure("categorize", len(pwords), generator.categorize, lambda: reseed() + (pwords,), repeat)
+    records.append(record)
+    _, record = measure("assemble", n_sent, lambda: list(generator.sentence_shard(categories, seed, n_sent)), repeat=repeat)
+    records.append(record)
+    generator.words.close()
+    return records
+
+def git_commit():
+    """
+    Returns the commit of the repository, None if it cannot be found
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Times every stage of the Jabberwocky sentence generator and writes the results as JSON.")
+    parser.add_argument("-l", "--language", choices=sorted(jsg.LANGUAGES), default="ukrainian", help="language of the generator (default: ukrainian)")
+    parser.add_argument("-c", "--corpus", help="database that the sized corpora are cut from (uk_UA.csv or tr_TR.csv by default)")
+    parser.add_argument("--sizes", default="10000,50000", help="comma separated numbers of lines of the database, 0 for all of it (default: 10000,50000)")
+    parser.add_argument("--synthetic", default="20000", help="comma separated numbers of words of the synthetic corpora, empty for none (default: 20000)")
+    parser.add_argument("-w", "--words", type=int, default=20000, help="number of pseudostems to sample (default: 20000)")
+    parser.add_argument("-n", "--sentences", type=int, default=100000, help="number of sentences to assemble (default: 100000)")
+    parser.add_argument("--order", type=jsg.model_order, default=2, help="order of the syllable model (default: 2)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators (default: 0)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="number of timed runs of every stage, the best is kept (default: 3)")
+    parser.add_argument("-o", "--output", help="file to write the JSON results to (default: standard output)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    cls, corpus = jsg.LANGUAGES[args.language]
+    source = args.corpus or os.path.join(ROOT, corpus)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        corpora = []
+        for size in [int(s) for s in args.sizes.split(",") if s]:
+            if size:
+                corpora.append(("%s[:%d]" % (os.path.basename(source), size), sliced_corpus(os.path.join(directory, "sliced_%d.csv" % size), source, size)))
+            else:
+                corpora.append((os.path.basename(source), source))
+        for size in [int(s) for s in args.synthetic.split(",") if s]:
+            corpora.append(("synthetic[%d]" % size, synthetic_corpus(os.path.join(directory, "synthetic_%d.csv" % size), size, args.language, args.seed)))
+        for name, path in corpora:
+            for record in bench_corpus(cls, path, args.words, args.sentences, args.order, args.seed, args.repeat):
+                record["corpus"] = name
+                results.append(record)
+                print("%-24s %-12s %10.4f s %14.1f items/s %10.1f MB" % (name, record["stage"], record["seconds"], record["throughput"] or 0, record["peak_bytes"] / 1e6), file=sys.stderr)
+    report = {"commit": git_commit(),
+              "python": platform.python_version(),
+              "numpy": jsg.np.__version__ if jsg.np is not None else None,
+              "language": args.language,
+              "order": args.order,
+              "seed": args.seed,
+              "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,10 +9,2053 @@ Original file is located at
 import ukrsyllab #syllabificator for Ukrainian
 
 from syllable import Encoder #this function separates Turkish words into syllables
-import re, random
+import re, random, itertools
+import argparse, json, sys
+import hashlib, os, mmap, copy, collections, multiprocessing, time, contextlib, warnings, math
+import csv, gzip, io
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from array import array
+from importlib import metadata
+try:
+  import numpy as np #optional, used for generating the pseudostems in batches
+except ImportError:
+  np = None
+try:
+  import zstandard #optional, used for the zstd compressed output
+except ImportError:
+  zstandard = None
+try:
+  import pyarrow, pyarrow.parquet #optional, used for the Parquet output
+except ImportError:
+  pyarrow = None
 from TurkishStemmer import TurkishStemmer #this function stems Turkish words 
 from uk_stemmer import UkStemmer #this function stems Ukrainian words
-from ast import literal_eval
+
+REPEATS = re.compile(r'(.+?)\1+') #a part of a word that is repeated right after itself
+VOWEL_PAIR = re.compile("[aeıioöuü][aeıioöuü]") #in Turkish two vowels do not appear together
+
+class Vowel_ranks(dict):
+  """
+  A str.translate table that maps the Turkish vowels to the rank of their 
+  vowel harmony group, the groups are checked in the order [aı], [ei], [ou], 
+  [öü]. Every other character is deleted, so the smallest character of a 
+  translated syllable is the group that decides the harmony of the next one
+  """
+  def __missing__(self, key):
+    self[key] = None #the characters that are not vowels are deleted
+    return None
+
+VOWEL_RANKS = Vowel_ranks({ord(v): str(rank) for rank, group in enumerate(["aı", "ei", "ou", "öü"]) for v in group})
+HARMONY_TABLES = {"0": str.maketrans("eiouöü", "aaaaaa"), #the rewrites of the next syllable for every vowel harmony group
+                  "1": str.maketrans("aıouöü", "eeeeee"),
+                  "2": str.maketrans("eiıoöü", "aaaaaa"),
+                  "3": str.maketrans("aiıoöu", "eeeeee")}
+
+#the harmony class of the last vowel and the class of the final letter of Turkish words
+HARMONY = {"a": "back", "ı": "back", "o": "back", "u": "back", "e": "front", "i": "front", "ö": "front", "ü": "front"}
+FINAL_CLASS = dict.fromkeys("aeıioöuü", "vowel")
+FINAL_CLASS.update({"p": "p", "ç": "ç", "t": "t", "k": "k", "f": "voiceless", "s": "voiceless", "ş": "voiceless", "h": "voiceless"})
+
+#(category, harmony, final) -> (number of letters that are cut from the end of the word, suffix)
+TURKISH_SUFFIXES = {}
+for harmony, high, low in (("back", "ı", "a"), ("front", "i", "e")):
+  for final in ("vowel", "p", "ç", "t", "k", "voiceless", "voiced"):
+    voiceless = final not in ("vowel", "voiced")
+    TURKISH_SUFFIXES["PREDICATE", harmony, final] = (0, ("t" if voiceless else "d") + high) #past tense suffix
+    TURKISH_SUFFIXES["ADVERBIAL MODIFIER", harmony, final] = (0, ("ç" if voiceless else "c") + low)
+    TURKISH_SUFFIXES["OBJECT", harmony, final] = (0, high) #accusative suffix
+  TURKISH_SUFFIXES["OBJECT", harmony, "vowel"] = (0, "y" + high)
+  TURKISH_SUFFIXES["OBJECT", harmony, "p"] = (1, "b" + high) #the final consonant is softened
+  TURKISH_SUFFIXES["OBJECT", harmony, "ç"] = (1, "c" + high)
+  TURKISH_SUFFIXES["OBJECT", harmony, "k"] = (1, "ğ" + high)
+
+#the agreement features of the Ukrainian categories, by the last letters of the words
+SUBJECT_AGREEMENT = {"о": "ло", "е": "ло", "а": "ла", "я": "ла", "ь": "ла", "к": "в", "м": "в", "с": "в", "т": "в", "р": "в"} #the ending of the predicate that agrees with a subject
+PREDICATE_FEATURE = {"ло": "ло", "ла": "ла", "в": "в"}
+OBJECT_AGREEMENT = {"и": "ої", "і": "ої", "а": "ого", "я": "ого"} #the ending of the attribute that agrees with an object
+ATTRIBUTE_FEATURE = {"ої": "ої", "ого": "ого"}
+
+#the suffixes by which the Ukrainian categories are implied, in the order of precedence
+UKRAINIAN_CATEGORIES = [("SUBJECT", ['ик','ник','івник','льник','иво','аль','ень','ець','ість','тель','иця','иня','ння','іння','ання','яння','ення','иння','еня','ечок','ечка','ечко','ичок','ичка','енко','исько','ище','івка','овка','ок','ир','ист','изм','ір','іст','ізм']),
+                        ("ADVERBIAL MODIFIER", ['-таки', '-то', 'но', 'ацька']),
+                        ("PREDICATE", ['ти']),
+                        ("ATTRIBUTE", ['ий'])]
+#the gendered suffixes of the subjects and the endings that they get as objects in the accusative
+OBJECT_INFLECTIONS = [(['ик','ник','івник','льник','ок','ир','ист','изм', 'ір', 'іст', 'ізм'], 'а'), #masculine nouns that end in a hard consonant
+                      (['аль', 'ень', 'тель', 'ець'], 'я'), #masculine nouns that end in a soft consonant
+                      (['иця','иня','ння','іння','ання','яння','иння'], 'і'), #feminine nouns that end in a soft consonant
+                      (['ичка', 'івка', 'овка'], 'и'), #feminine nouns that end in a hard consonant
+                      (['иво', 'ечко', 'енко', 'исько','ище'], 'а')] #neutral nouns
+
+class Suffix_index():
+  """
+  A trie of reversed suffixes that classifies a word by its ending. The letters
+  of the word are read from the end, so the category and the gender group of 
+  a word are found in one pass over its last letters, instead of checking 
+  every suffix of every category one by one.
+    ...
+
+    Attributes
+    ----------
+    categories : list
+        the names of the categories in the order of precedence
+    root : dict
+        the root node of the trie, every node is a dictionary from a letter to
+        the next node, and the suffixes that end at a node are tagged under the
+        key None
+
+    Methods
+    -------
+    node(suffix):
+        returns the tags of a suffix, the nodes are created if necessary
+    classify(word):
+        finds the category and the gender group of a word
+  """
+  def __init__(self, categories, groups):
+    """
+    Builds the trie of the suffixes
+
+        Parameters
+        ----------
+        categories : list
+            a list of (category, suffixes) tuples in the order of precedence
+        groups : list
+            a list of (suffixes, inflection) tuples of the gender groups
+    """
+    self.categories = [category for category, suffixes in categories]
+    self.root = {}
+    for rank, (category, suffixes) in enumerate(categories):
+      for suffix in suffixes:
+        self.node(suffix).setdefault("category", rank) #the categories are added in the order of precedence, so the first one is kept
+    for group, (suffixes, inflection) in enumerate(groups):
+      for suffix in suffixes:
+        self.node(suffix).setdefault("group", group)
+
+  def node(self, suffix):
+    """
+    Returns the tags of a suffix, the nodes of the trie are created if necessary
+
+        Parameters
+        ----------
+        suffix : str
+            a suffix
+
+        Returns
+        -------
+        tags : dict
+            the tags of the suffix
+    """
+    node = self.root
+    for c in reversed(suffix):
+      node = node.setdefault(c, {})
+    return node.setdefault(None, {})
+
+  def classify(self, word):
+    """
+    Finds the category and the gender group of a word by the suffixes that it 
+    ends with. If the word ends with the suffixes of more than one category, 
+    the category that comes first is picked.
+
+        Parameters
+        ----------
+        word : str
+            a Ukrainian pseudoword
+
+        Returns
+        -------
+        category : str or None
+            the category of the word, None if it does not end with any suffix
+        group : int or None
+            the index of the gender group of the word, None if it does not 
+            end with a gendered suffix
+    """
+    rank = group = None
+    node = self.root
+    for c in reversed(word): #the walk ends at the longest suffix that the word ends with
+      node = node.get(c)
+      if node is None:
+        break
+      tags = node.get(None)
+      if tags:
+        if "category" in tags and (rank is None or tags["category"] < rank):
+          rank = tags["category"]
+        if group is None:
+          group = tags.get("group")
+    return (None if rank is None else self.categories[rank]), group
+
+UKRAINIAN_SUFFIXES = Suffix_index(UKRAINIAN_CATEGORIES, OBJECT_INFLECTIONS)
+
+def make_rng(seed=None):
+  """
+  Returns the random generator of a seed. The same seed always gives the same
+  sequence of random numbers, so the runs with a seed can be reproduced
+
+      Parameters
+      ----------
+      seed : int, random.Random or numpy.random.Generator, optional
+          a seed, a random generator that is used as it is, or a NumPy 
+          generator that the seed is drawn from, a random seed from the 
+          operating system is used by default
+
+      Returns
+      -------
+      rng : random.Random
+          the random generator
+  """
+  if isinstance(seed, random.Random):
+    return seed
+  if np is not None and isinstance(seed, np.random.Generator):
+    seed = int.from_bytes(seed.bytes(16), "little")
+  return random.Random(seed)
+
+def spawn_seeds(rng, n):
+  """
+  Derives the seeds of n independent random streams, one for every worker or
+  shard, from a random generator. With NumPy the seeds are spawned from a 
+  numpy.random.SeedSequence, otherwise they are hashed from the same entropy.
+  The seeds only depend on the state of the generator, so the streams of a 
+  seeded run are the same however the shards are spread over the processes
+
+      Parameters
+      ----------
+      rng : random.Random
+          the parent random generator, it is advanced by one draw
+      n : int
+          number of streams
+
+      Returns
+      -------
+      seeds : list
+          n integer seeds, for random.Random or numpy.random.default_rng
+  """
+  entropy = rng.getrandbits(128)
+  if np is None:
+    return [int.from_bytes(hashlib.sha256(b"%d:%d" % (entropy, i)).digest()[:16], "little") for i in range(n)]
+  return [int.from_bytes(child.generate_state(4).tobytes(), "little") for child in np.random.SeedSequence(entropy).spawn(n)]
+
+class Alias_sampler():
+  """
+  A Walker/Vose alias table that picks a random value from a weighted 
+  population in constant time. The table is built once, and every draw needs 
+  only two random numbers, no matter how large the population is.
+
+    ...
+
+    Attributes
+    ----------
+    values : array or list
+        the population that is sampled
+    prob : array
+        the probability of keeping the value of a column of the table, as 
+        32-bit floats
+    alias : array
+        the index of the value that is picked when the value of a column is not 
+        kept
+
+    Methods
+    -------
+    table(weights):
+        builds the columns of an alias table
+    draw(rng=random):
+        picks a random value from the population
+  """
+  __slots__ = ("values", "prob", "alias") #there is a sampler for every syllable, so they are kept small
+
+  def __init__(self, values, weights):
+    """
+    Builds the alias table of a weighted population
+
+        Parameters
+        ----------
+        values : array or list
+            the population to be sampled, an array is used without copying it
+        weights : list
+            the weights of the values, they do not need to sum up to 1
+    """
+    self.values = values if isinstance(values, array) else list(values)
+    prob, alias = self.table(weights)
+    self.prob = array("f", prob)
+    self.alias = array("I", alias)
+
+  @staticmethod
+  def table(weights):
+    """
+    Builds the columns of the alias table of a weighted population
+
+        Parameters
+        ----------
+        weights : list
+            the weights of the values, they do not need to sum up to 1
+
+        Returns
+        -------
+        prob : list
+            the probability of keeping the value of every column
+        alias : list
+            the index of the value that is picked when the value of a column 
+            is not kept
+    """
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights] #the average column has the value 1
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1]
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+    while small and large: #every column with less than 1 is filled up by a column with more than 1
+      l = small.pop()
+      g = large.pop()
+      prob[l] = scaled[l]
+      alias[l] = g
+      scaled[g] = scaled[g] + scaled[l] - 1
+      if scaled[g] < 1:
+        small.append(g)
+      else:
+        large.append(g)
+    #the columns that are left are full, up to floating point errors
+    return prob, alias
+
+  def draw(self, rng=random):
+    """
+    Picks a random value from the population according to its weight
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            the random generator, the random module is used by default
+
+        Returns
+        -------
+        value : object
+            a value from the population
+    """
+    i = int(rng.random() * len(self.values))
+    if rng.random() < self.prob[i]:
+      return self.values[i]
+    return self.values[self.alias[i]]
+
+class Alias_rows():
+  """
+  The alias tables of many weighted populations (rows) that are stored one 
+  after the other in flat arrays, like the rows of a sparse matrix. A row 
+  costs a few bytes for every value instead of a Python object for every 
+  value, and a value is picked from a row in constant time like with 
+  Alias_sampler.
+
+    ...
+
+    Attributes
+    ----------
+    offsets : array
+        the start of every row in the other arrays, and the end of the last row
+    values : array
+        the values of the rows, row by row
+    counts : array
+        the weights (counts) of the values
+    prob : array
+        the probability of keeping the value of a column, as 32-bit floats
+    alias : array
+        the index of the value inside its row that is picked when the value of 
+        a column is not kept
+
+    Methods
+    -------
+    row(r):
+        returns the values and the counts of a row as a dictionary
+    draw(r, rng=random):
+        picks a random value from a row
+  """
+  __slots__ = ("offsets", "values", "counts", "prob", "alias")
+
+  def __init__(self, offsets, values, counts):
+    """
+    Builds the alias tables of the rows
+
+        Parameters
+        ----------
+        offsets : array
+            the start of every row and the end of the last row
+        values : array
+            the values of the rows
+        counts : array
+            the counts of the values
+    """
+    self.offsets = offsets
+    self.values = values
+    self.counts = counts
+    self.prob = array("f")
+    self.alias = array("I")
+    for r in range(len(offsets) - 1):
+      prob, alias = Alias_sampler.table(counts[offsets[r]:offsets[r + 1]])
+      self.prob.extend(prob)
+      self.alias.extend(alias)
+
+  def __len__(self):
+    return len(self.offsets) - 1
+
+  def row(self, r):
+    """
+    Returns the values and the counts of a row
+
+        Parameters
+        ----------
+        r : int
+            the index of the row
+
+        Returns
+        -------
+        row : dict
+            a dictionary that has the values as keys and the counts as values
+    """
+    start, end = self.offsets[r], self.offsets[r + 1]
+    return dict(zip(self.values[start:end], self.counts[start:end]))
+
+  def draw(self, r, rng=random):
+    """
+    Picks a random value from a row according to its count
+
+        Parameters
+        ----------
+        r : int
+            the index of the row
+        rng : random.Random, optional
+            the random generator, the random module is used by default
+
+        Returns
+        -------
+        value : int or None
+            a value from the row, None if the row is empty
+    """
+    start = self.offsets[r]
+    size = self.offsets[r + 1] - start
+    if not size:
+      return None
+    i = start + int(rng.random() * size)
+    if rng.random() < self.prob[i]:
+      return self.values[i]
+    return self.values[start + self.alias[i]]
+
+class Syllable_inventory():
+  """
+  The syllables of a language, every syllable is stored once and gets a small
+  integer ID. The words are stored as arrays of syllable IDs, and they are 
+  joined into strings only when they are needed.
+    ...
+
+    Attributes
+    ----------
+    syllables : list
+        the syllables, the index of a syllable in the list is its ID
+    ids : dict
+        a dictionary that maps every syllable to its ID
+
+    Methods
+    -------
+    intern(syllable):
+        returns the ID of a syllable, adding it if necessary
+    encode(syllables):
+        returns the IDs of a sequence of syllables
+    decode(ids):
+        returns the syllables of a sequence of IDs
+    join(ids):
+        returns the word that a sequence of IDs spells
+  """
+  __slots__ = ("syllables", "ids")
+
+  def __init__(self):
+    """
+    Constructs an empty inventory
+    """
+    self.syllables = [] #ID -> syllable
+    self.ids = {} #syllable -> ID
+
+  def __len__(self):
+    return len(self.syllables)
+
+  def __getitem__(self, sid):
+    return self.syllables[sid]
+
+  def __iter__(self):
+    return iter(self.syllables)
+
+  def intern(self, syllable):
+    """
+    Returns the ID of a syllable, if the syllable is not in the inventory it is
+    added with the next ID
+
+        Parameters
+        ----------
+        syllable : str
+            a syllable
+
+        Returns
+        -------
+        ID : int
+            the ID of the syllable
+    """
+    sid = self.ids.get(syllable)
+    if sid is None:
+      sid = self.ids[syllable] = len(self.syllables)
+      self.syllables.append(syllable)
+    return sid
+
+  def encode(self, syllables):
+    """
+    Returns the IDs of a sequence of syllables, the syllables that are not in 
+    the inventory are added
+
+        Parameters
+        ----------
+        syllables : list
+            a list of syllables
+
+        Returns
+        -------
+        ids : array
+            the IDs of the syllables
+    """
+    return array("I", [self.intern(s) for s in syllables])
+
+  def decode(self, ids):
+    """
+    Returns the syllables of a sequence of IDs
+
+        Parameters
+        ----------
+        ids : array or list
+            syllable IDs
+
+        Returns
+        -------
+        syllables : list
+            a list of syllables
+    """
+    syllables = self.syllables
+    return [syllables[i] for i in ids]
+
+  def join(self, ids):
+    """
+    Returns the word that a sequence of IDs spells
+
+        Parameters
+        ----------
+        ids : array or list
+            syllable IDs
+
+        Returns
+        -------
+        word : str
+            the syllables joined together
+    """
+    syllables = self.syllables
+    return "".join([syllables[i] for i in ids])
+
+class Transition_model():
+  """
+  A sparse model of the syllable transitions in a language. Every syllable is 
+  interned to an integer ID, and only the transitions that are observed in the
+  database are stored, so the model grows with the number of observed syllable 
+  pairs and not with the square of the number of syllables. 
+
+  If the order of the model is more than 2, the syllables that follow longer 
+  contexts (tuples of 2 or more syllable IDs) are counted as well. Only the 
+  observed contexts are stored, and a syllable is picked after the longest 
+  context of the word that was observed, backing off to the shorter contexts 
+  and finally to the previous syllable alone.
+
+    ...
+
+    Attributes
+    ----------
+    order : int
+        the order of the model, 2 for syllable pairs, 3 for syllable triples...
+    inventory : Syllable_inventory
+        the syllable inventory
+    syllables : list
+        the syllables of the inventory, the index of a syllable in the list is 
+        its ID
+    ids : dict
+        a dictionary that maps every syllable to its ID
+    counts : list or None
+        a list that has a dictionary for every syllable ID, the keys of the 
+        dictionary are the IDs of the following syllables and the values are 
+        the number of times they follow it, None after normalize
+    initial : dict
+        a dictionary that has the IDs of the initial syllables as keys and the
+        number of times they occur as the first syllable as values
+    contexts : dict or None
+        a dictionary that has the observed contexts of 2 to order - 1 syllable
+        IDs as keys and dictionaries of the following syllable IDs and their 
+        counts as values, None after normalize
+    transitions : Alias_rows or None
+        the following syllable IDs and their counts for every syllable ID in 
+        flat arrays, filled by normalize
+    initial_row : tuple
+        the IDs of the initial syllables and their probabilities in arrays
+    initial_sampler : Alias_sampler
+        an Alias_sampler of the initial syllables
+    context_index : dict
+        a dictionary that maps every observed context to its row in 
+        context_rows
+    context_rows : Alias_rows or None
+        the following syllable IDs and their counts for every context in flat
+        arrays, filled by normalize
+
+    Methods
+    -------
+    intern(syllable):
+        returns the ID of a syllable, adding it to the inventory if necessary
+    add_word(syllables):
+        counts the initial syllable and the syllable pairs of a word
+    count_ids(word):
+        counts a word that is given as syllable IDs
+    add_batch(batch):
+        counts the initial syllables and the syllable pairs of many words that 
+        are stored in flat arrays
+    add_words(syllables):
+        counts the words that are given as a list of lists or as flat arrays
+    merge(data):
+        adds the counts of a packed model to the counts of the model
+    normalize(n_stems):
+        moves the counts into flat arrays and builds the alias tables
+    pack_rows(rows):
+        stores rows of counts in flat arrays
+    next_id(word, rng=random):
+        picks the ID of a random syllable that follows the longest observed 
+        context of a word that is given as syllable IDs
+    walk_ids(plen, rng=random):
+        creates a random sequence of syllable IDs that is at least plen 
+        letters long, unless a syllable that is never followed by another one 
+        is picked
+    walk(plen, rng=random):
+        creates a random sequence of syllables like walk_ids
+    pack():
+        stores the syllable inventory and the counts in flat arrays
+    unpack(data):
+        builds a model from the arrays created by pack
+  """
+  max_order = 256 #the sizes of the contexts are stored in bytes by pack
+
+  def __init__(self, order=2):
+    """
+    Constructs an empty transition model
+
+        Parameters
+        ----------
+        order : int, optional
+            the order of the model, from 2 to max_order, the default value is
+            2
+    """
+    if not 2 <= order <= self.max_order:
+      raise ValueError("the order of the model must be between 2 and %d, not %r" % (self.max_order, order))
+    self.order = order
+    self.inventory = Syllable_inventory()
+    self.syllables = self.inventory.syllables #ID -> syllable
+    self.ids = self.inventory.ids #syllable -> ID
+    self.counts = [] #a row of counts for every syllable ID, only non-zero counts are stored
+    self.initial = {} #initial syllable ID -> count
+    self.contexts = {} #a row of counts for every observed context of 2 or more syllable IDs
+    self.transitions = None #the rows of counts in flat arrays, filled by normalize
+    self.initial_row = (array("I"), array("f"))
+    self.initial_sampler = None
+    self.context_index = {} #context -> row of context_rows, filled by normalize
+    self.context_rows = None
+
+  def intern(self, syllable):
+    """
+    Returns the ID of a syllable, if the syllable is not in the inventory it is
+    added with a new ID
+
+        Parameters
+        ----------
+        syllable : str
+            a syllable
+
+        Returns
+        -------
+        ID : int
+            the ID of the syllable
+    """
+    sid = self.inventory.intern(syllable)
+    if sid == len(self.counts): #a new syllable gets an empty row of counts
+      self.counts.append({})
+    return sid
+
+  def add_word(self, syllables):
+    """
+    Counts the initial syllable and all the pairs of consequative syllables of
+    a word, the words that have only one syllable are not counted
+
+        Parameters
+        ----------
+        syllables : list
+            a list of the syllables of a word
+
+        Returns
+        -------
+        None
+    """
+    syllables = [s for s in syllables if s != ""]
+    if len(syllables) < 2: #if the word has only one syllable, it is not going to be added to the probability
+      return
+    self.count_ids([self.intern(s) for s in syllables])
+
+  def count_ids(self, word):
+    """
+    Counts the initial syllable, the pairs of consequative syllables and, if 
+    the order of the model is more than 2, the longer contexts of a word that 
+    is given as syllable IDs
+
+        Parameters
+        ----------
+        word : list
+            a list of the syllable IDs of a word
+
+        Returns
+        -------
+        None
+    """
+    first = word[0]
+    self.initial[first] = self.initial.get(first, 0) + 1
+    for k in range(1, len(word)): #taking every syllable with the syllables before it
+      nid = word[k]
+      row = self.counts[word[k - 1]]
+      row[nid] = row.get(nid, 0) + 1
+      for size in range(2, min(self.order - 1, k) + 1):
+        row = self.contexts.setdefault(tuple(word[k - size:k]), {})
+        row[nid] = row.get(nid, 0) + 1
+
+  def add_batch(self, batch):
+    """
+    Counts the initial syllables and the syllable pairs of many words at once,
+    the words are read from the flat arrays of a ukrsyllab.SyllableBatch 
+    without building a list for every word
+
+        Parameters
+        ----------
+        batch : ukrsyllab.SyllableBatch
+            the syllable IDs of the words, the offsets of the words and the 
+            syllable inventory of the batch
+
+        Returns
+        -------
+        None
+    """
+    ids, offsets, inventory = batch
+    remap = [-1] * len(inventory) #batch ID -> model ID, the syllables are interned in the same order as add_word would intern them
+    word = []
+    for w in range(len(offsets) - 1):
+      start, end = offsets[w], offsets[w + 1]
+      if end - start < 2: #the words that have only one syllable are not counted
+        continue
+      word.clear()
+      for k in range(start, end):
+        sid = remap[ids[k]]
+        if sid < 0:
+          sid = remap[ids[k]] = self.intern(inventory[ids[k]])
+        word.append(sid)
+      self.count_ids(word)
+
+  def add_words(self, syllables):
+    """
+    Counts the initial syllables and the syllable pairs of many words
+
+        Parameters
+        ----------
+        syllables : list or ukrsyllab.SyllableBatch
+            a list of lists that contains syllables of different words, or the 
+            syllables of the words in flat arrays
+
+        Returns
+        -------
+        None
+    """
+    if isinstance(syllables, ukrsyllab.SyllableBatch):
+      self.add_batch(syllables)
+    else:
+      for s in syllables:
+        self.add_word(s)
+
+  def merge(self, data):
+    """
+    Adds the counts of a packed model to the counts of the model. The 
+    syllables of the packed model are interned in the order of its IDs, so 
+    merging the models of consequative parts of a database in order gives the 
+    same model as counting the whole database at once
+
+        Parameters
+        ----------
+        data : dict
+            a dictionary that is returned by pack
+
+        Returns
+        -------
+        None
+    """
+    other = Transition_model.unpack(data)
+    remap = [self.intern(syllable) for syllable in other.syllables]
+    for oid, count in other.initial.items():
+      sid = remap[oid]
+      self.initial[sid] = self.initial.get(sid, 0) + count
+    for oid, other_row in enumerate(other.counts):
+      row = self.counts[remap[oid]]
+      for nid, count in other_row.items():
+        nid = remap[nid]
+        row[nid] = row.get(nid, 0) + count
+    for context, other_row in other.contexts.items():
+      row = self.contexts.setdefault(tuple(remap[oid] for oid in context), {})
+      for nid, count in other_row.items():
+        nid = remap[nid]
+        row[nid] = row.get(nid, 0) + count
+
+  def normalize(self, n_stems):
+    """
+    Turns the counts into probabilities. The rows of counts are moved into the 
+    flat arrays of Alias_rows, where the probabilities of the following 
+    syllables are given by the counts of a row, and the dictionaries of counts
+    are released, so no more words can be counted afterwards. The 
+    probabilities of the initial syllables are normalized by the number of 
+    stems. An alias table is built for every row, so that the syllables can be
+    drawn in constant time afterwards
+
+        Parameters
+        ----------
+        n_stems : int
+            the number of stems the model is trained on
+
+        Returns
+        -------
+        None
+    """
+    self.transitions = Alias_rows(*self.pack_rows(self.counts))
+    self.initial_row = (array("I", self.initial), array("f", [c / n_stems for c in self.initial.values()]))
+    self.initial_sampler = Alias_sampler(*self.initial_row)
+    self.context_index = {context: r for r, context in enumerate(self.contexts)}
+    self.context_rows = Alias_rows(*self.pack_rows(self.contexts.values()))
+    self.counts = self.contexts = None #the counts are kept in the flat arrays
+
+  @staticmethod
+  def pack_rows(rows):
+    """
+    Stores rows of counts in flat arrays, every row is a slice of next_ids and
+    next_counts that starts at its offset
+
+        Parameters
+        ----------
+        rows : iterable
+            dictionaries of the following syllable IDs and their counts
+
+        Returns
+        -------
+        offsets : array
+            the start of every row and the end of the last row
+        next_ids : array
+            the following syllable IDs, row by row
+        next_counts : array
+            the counts of the following syllables
+    """
+    offsets = array("I", [0])
+    next_ids = array("I")
+    next_counts = array("I")
+    for row in rows:
+      next_ids.extend(row.keys())
+      next_counts.extend(row.values())
+      offsets.append(len(next_ids))
+    return offsets, next_ids, next_counts
+
+  def next_id(self, word, rng=random):
+    """
+    Picks the ID of a random syllable that follows the given syllables. The 
+    longest context of the last syllables (up to order - 1 of them) that was 
+    observed is used, if none of the contexts was observed it backs off to the
+    last syllable alone
+
+        Parameters
+        ----------
+        word : array or list
+            the syllable IDs of a word
+        rng : random.Random, optional
+            the random generator, the random module is used by default
+
+        Returns
+        -------
+        ID : int or None
+            the ID of a syllable that follows the given ones, None if the last
+            syllable is never followed by another one
+    """
+    for size in range(min(self.order - 1, len(word)), 1, -1):
+      r = self.context_index.get(tuple(word[-size:]))
+      if r is not None:
+        return self.context_rows.draw(r, rng)
+    return self.transitions.draw(word[-1], rng)
+
+  def walk_ids(self, plen, rng=random):
+    """
+    Creates a random sequence of syllable IDs. The first syllable is picked 
+    from the initial syllables and every next one from the syllables that 
+    follow the previous ones, until the sequence has at least plen letters or 
+    a syllable that is never followed by another one is picked
+
+        Parameters
+        ----------
+        plen : int
+            the length of the sequence in letters
+        rng : random.Random, optional
+            the random generator, the random module is used by default
+
+        Returns
+        -------
+        word : array
+            the syllable IDs of the sequence
+    """
+    syllables = self.syllables
+    word = array("I") #an empty array to store the syllable IDs of the sequence
+    i = 0 #length of the sequence
+    while i < plen:
+      if not word: #initial syllables are picked from the initial syllable probabilities
+        sid = self.initial_sampler.draw(rng)
+      else:
+        sid = self.next_id(word, rng)
+        if sid is None: #certain syllables only appear in the end of words, if such a syllable is picked, the word should end not elaborate
+          break
+      i += len(syllables[sid]) #increase the length of the sequence by the picked sound
+      word.append(sid)
+    return word
+
+  def walk(self, plen, rng=random):
+    """
+    Creates a random sequence of syllables, like walk_ids
+
+        Parameters
+        ----------
+        plen : int
+            the length of the sequence in letters
+        rng : random.Random, optional
+            the random generator, the random module is used by default
+
+        Returns
+        -------
+        pword : list
+            a list of syllables
+    """
+    return self.inventory.decode(self.walk_ids(plen, rng))
+
+  def pack(self):
+    """
+    Stores the syllable inventory, the initial syllable counts and the 
+    transition counts in flat arrays, the transitions are stored row by row
+    (every row is a slice of next_ids and next_counts that starts at its 
+    offset). The contexts are stored in the same way, the syllable IDs of the 
+    contexts are concatenated in context_ids. A normalized model already has 
+    its counts in flat arrays, they are used as they are
+
+        Returns
+        -------
+        data : dict
+            a dictionary of strings and arrays that can be stored on disk
+    """
+    if self.transitions is None:
+      offsets, next_ids, next_counts = self.pack_rows(self.counts)
+      context_offsets, context_next_ids, context_next_counts = self.pack_rows(self.contexts.values())
+      contexts = self.contexts
+    else:
+      offsets, next_ids, next_counts = self.transitions.offsets, self.transitions.values, self.transitions.counts
+      context_offsets, context_next_ids, context_next_counts = self.context_rows.offsets, self.context_rows.values, self.context_rows.counts
+      contexts = self.context_index
+    context_ids = array("I")
+    context_sizes = array("B")
+    for context in contexts:
+      context_ids.extend(context)
+      context_sizes.append(len(context))
+    return {"order": self.order,
+            "syllables": "\n".join(self.syllables),
+            "initial_ids": array("I", self.initial.keys()),
+            "initial_counts": array("I", self.initial.values()),
+            "offsets": offsets,
+            "next_ids": next_ids,
+            "next_counts": next_counts,
+            "context_ids": context_ids,
+            "context_sizes": context_sizes,
+            "context_offsets": context_offsets,
+            "context_next_ids": context_next_ids,
+            "context_next_counts": context_next_counts}
+
+  @classmethod
+  def unpack(cls, data):
+    """
+    Builds a model from the arrays that are created by pack, the model still 
+    needs to be normalized
+
+        Parameters
+        ----------
+        data : dict
+            a dictionary that is returned by pack
+
+        Returns
+        -------
+        model : Transition_model
+            a model that has the same counts as the packed one
+    """
+    model = cls(data["order"])
+    for syllable in data["syllables"].split("\n") if data["syllables"] else []:
+      model.intern(syllable)
+    model.initial = dict(zip(data["initial_ids"], data["initial_counts"]))
+    offsets, next_ids, next_counts = data["offsets"], data["next_ids"], data["next_counts"]
+    for sid in range(len(model.syllables)):
+      start, end = offsets[sid], offsets[sid + 1]
+      model.counts[sid] = dict(zip(next_ids[start:end], next_counts[start:end]))
+    offsets, next_ids, next_counts = data["context_offsets"], data["context_next_ids"], data["context_next_counts"]
+    position = 0
+    for c, size in enumerate(data["context_sizes"]):
+      context = tuple(data["context_ids"][position:position + size])
+      position += size
+      start, end = offsets[c], offsets[c + 1]
+      model.contexts[context] = dict(zip(next_ids[start:end], next_counts[start:end]))
+    return model
+
+class Batch_generator():
+  """
+  Creates many random syllable sequences of a Transition_model at once with 
+  NumPy. The transition probabilities are stored as cumulative rows in flat 
+  arrays, and every step draws the next syllable of all the sequences that are
+  still growing with one vectorized search.
+
+    ...
+
+    Attributes
+    ----------
+    syllables : list
+        the syllable inventory of the model
+    lengths : numpy.ndarray
+        the length of every syllable in letters
+    offsets : numpy.ndarray
+        the start of the row of every syllable in next_ids and cumulative
+    next_ids : numpy.ndarray
+        the IDs of the following syllables, row by row
+    cumulative : numpy.ndarray
+        the cumulative probabilities of the rows, the row of the syllable with
+        the ID r goes from r to r + 1, so all the rows can be searched at once
+    initial_ids : numpy.ndarray
+        the IDs of the initial syllables
+    initial_cumulative : numpy.ndarray
+        the cumulative probabilities of the initial syllables
+
+    Methods
+    -------
+    generate(n, plen, rng):
+        creates n sequences of syllable IDs
+    walks(n, plen, rng):
+        creates n sequences of syllables
+  """
+
+  def __init__(self, model):
+    """
+    Builds the flat arrays of a normalized model
+
+        Parameters
+        ----------
+        model : Transition_model
+            a normalized transition model
+    """
+    self.syllables = model.syllables
+    self.lengths = np.array([len(syllable) for syllable in model.syllables], dtype=np.int64)
+    rows = model.transitions #the flat arrays of the model are read without copying them
+    self.offsets = np.asarray(rows.offsets).astype(np.int64)
+    sizes = np.diff(self.offsets)
+    self.next_ids = np.asarray(rows.values).astype(np.int64)
+    total = np.concatenate(([0.0], np.cumsum(np.asarray(rows.counts, dtype=np.float64))))
+    within = total[1:] - np.repeat(total[self.offsets[:-1]], sizes) #the cumulative counts inside every row
+    row_totals = total[self.offsets[1:]] - total[self.offsets[:-1]]
+    within /= np.repeat(np.where(row_totals > 0, row_totals, 1.0), sizes) #the counts are turned into probabilities
+    self.cumulative = np.repeat(np.arange(len(sizes), dtype=np.float64), sizes) + within
+    ids, weights = model.initial_row
+    self.initial_ids = np.array(ids, dtype=np.int64)
+    self.initial_cumulative = np.cumsum(np.array(weights, dtype=np.float64))
+    if len(self.initial_cumulative):
+      self.initial_cumulative /= self.initial_cumulative[-1]
+
+  def generate(self, n, plen, rng):
+    """
+    Creates n random sequences of syllable IDs, like Transition_model.walk 
+    does for a single sequence
+
+        Parameters
+        ----------
+        n : int
+            number of sequences
+        plen : int
+            the length of a sequence in letters
+        rng : numpy.random.Generator
+            the random generator
+
+        Returns
+        -------
+        sequences : numpy.ndarray
+            an n by at most plen array of syllable IDs, the sequences that are
+            shorter are padded with -1
+    """
+    steps = max(plen, 1)
+    out = np.full((n, steps), -1, dtype=np.int64)
+    pick = np.searchsorted(self.initial_cumulative, rng.random(n), side="right")
+    current = self.initial_ids[np.minimum(pick, len(self.initial_ids) - 1)]
+    out[:, 0] = current
+    length = self.lengths[current]
+    active = np.nonzero(length < plen)[0] #the sequences that are still growing
+    step = 1
+    while len(active) and step < steps:
+      last = current[active]
+      start, end = self.offsets[last], self.offsets[last + 1]
+      alive = start < end #the sequences that end with a syllable that is never followed by another one are finished
+      active, last, end = active[alive], last[alive], end[alive]
+      pick = np.searchsorted(self.cumulative, last + rng.random(len(active)), side="right")
+      nxt = self.next_ids[np.minimum(pick, end - 1)] #the minimum is for the rounding errors at the end of a row
+      out[active, step] = nxt
+      current[active] = nxt
+      length[active] += self.lengths[nxt]
+      active = active[length[active] < plen]
+      step += 1
+    return out
+
+  def walks(self, n, plen, rng):
+    """
+    Creates n random sequences of syllables
+
+        Parameters
+        ----------
+        n : int
+            number of sequences
+        plen : int
+            the length of a sequence in letters
+        rng : numpy.random.Generator
+            the random generator
+
+        Returns
+        -------
+        pwords : list
+            a list of lists of syllables
+    """
+    syllables = self.syllables
+    return [[syllables[i] for i in row if i >= 0] for row in self.generate(n, plen, rng).tolist()]
+
+class Corpus():
+  """
+  A database of words, one word on every line, that is memory-mapped instead
+  of read into memory. The lines are decoded lazily, only when they are used, 
+  and a range of lines can be read without reading the lines before it, so 
+  the shards of the database can be handed to the worker processes as line 
+  ranges without copying the file.
+    ...
+
+    Attributes
+    ----------
+    filename : str
+        name of the database
+    encoding : str
+        the encoding of the database
+    data : mmap.mmap or bytes
+        the mapped content of the database
+    starts : array or None
+        the offsets of the beginnings of the lines, the last one is the end of
+        the last line plus one, built when it is first needed
+
+    Methods
+    -------
+    index():
+        finds the offsets of the beginnings of the lines
+    lines(start=0, stop=None):
+        yields the lines in a range one by one
+    close():
+        closes the mapping
+  """
+  def __init__(self, filename, encoding="utf8"):
+    """
+    Maps the database into memory
+
+        Parameters
+        ----------
+        filename : str
+            name of the database
+        encoding : str, optional
+            the encoding of the database, the default value is "utf8"
+    """
+    self.filename = filename
+    self.encoding = encoding
+    self.starts = None
+    with open(filename, "rb") as file: #the mapping stays valid after the file is closed
+      if os.fstat(file.fileno()).st_size:
+        self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+      else: #an empty file cannot be mapped
+        self.data = b""
+
+  def __getstate__(self): #the mapping is not sent to the worker processes, they map the file again
+    return {"filename": self.filename, "encoding": self.encoding, "starts": self.starts}
+
+  def __setstate__(self, state):
+    self.__init__(state["filename"], state["encoding"])
+    self.starts = state["starts"]
+
+  def __len__(self):
+    return len(self.index()) - 1
+
+  def __iter__(self):
+    return self.lines()
+
+  def __getitem__(self, key):
+    if isinstance(key, slice):
+      return list(self.lines(*key.indices(len(self))[:2]))
+    if key < 0:
+      key += len(self)
+    return next(self.lines(key, key + 1))
+
+  def index(self):
+    """
+    Finds the offsets of the beginnings of the lines in one pass over the 
+    database, the offsets are found only once
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        starts : array
+            the offsets of the beginnings of the lines, the last one is the
+            end of the last line plus one
+    """
+    if self.starts is None:
+      data = self.data
+      starts = array("Q", [0])
+      position = data.find(b"\n")
+      while position >= 0:
+        starts.append(position + 1)
+        position = data.find(b"\n", position + 1)
+      if starts[-1] < len(data): #the last line does not end with a new line
+        starts.append(len(data) + 1)
+      self.starts = starts
+    return self.starts
+
+  def lines(self, start=0, stop=None):
+    """
+    Yields the lines in a range one by one, without the line endings
+
+        Parameters
+        ----------
+        start : int, optional
+            the index of the first line, the default value is 0
+        stop : int, optional
+            the index after the last line, the lines are read until the end 
+            by default
+
+        Yields
+        ------
+        line : str
+            a line of the database
+    """
+    data, encoding = self.data, self.encoding
+    if start == 0 and stop is None and self.starts is None: #the whole database is read without building the index
+      begin = 0
+      end = data.find(b"\n")
+      while begin < len(data):
+        if end < 0:
+          end = len(data)
+        yield data[begin:end].rstrip(b"\r").decode(encoding)
+        begin = end + 1
+        end = data.find(b"\n", begin)
+      return
+    starts = self.index()
+    stop = len(starts) - 1 if stop is None else min(stop, len(starts) - 1)
+    for i in range(start, stop):
+      yield data[starts[i]:starts[i + 1] - 1].rstrip(b"\r").decode(encoding)
+
+  def close(self):
+    """
+    Closes the mapping
+    """
+    if isinstance(self.data, mmap.mmap):
+      self.data.close()
+
+class Bloom_filter():
+  """
+  A Bloom filter of strings. Every string sets n_hashes bits of a bit array,
+  the positions of the bits are derived from two halves of its blake2b hash. 
+  A string that was added is always found, a string that was not added is 
+  found only with the probability error_rate, so the filter stays much 
+  smaller than a set of the strings: about 19 bits for every string with the
+  default error rate.
+
+    ...
+
+    Attributes
+    ----------
+    bits : bytearray
+        the bit array, the bit p is the bit p % 8 of the byte p // 8
+    n_bits : int
+        the number of bits
+    n_hashes : int
+        the number of bits that every string sets
+    count : int
+        the number of strings that were added
+
+    Methods
+    -------
+    hashes(word):
+        returns the two hashes that the positions of the bits of a string are
+        derived from
+    add(word):
+        adds a string
+    update(words):
+        adds strings, in vectorized chunks if NumPy is installed
+    pack():
+        returns the filter as a dictionary that can be stored on disk
+    unpack(data):
+        builds a filter from the dictionary that is returned by pack
+  """
+  __slots__ = ("bits", "n_bits", "n_hashes", "count")
+  chunk_size = 65536 #number of the strings that are hashed together by update
+
+  def __init__(self, capacity, error_rate=0.0001):
+    """
+    Constructs an empty filter that is large enough for capacity strings
+
+        Parameters
+        ----------
+        capacity : int
+            the expected number of strings
+        error_rate : float, optional
+            the probability of finding a string that was not added when the
+            filter is full, the default value is 0.0001
+    """
+    capacity = max(1, capacity)
+    self.n_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+    self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+    self.bits = bytearray((self.n_bits + 7) // 8)
+    self.count = 0
+
+  def __len__(self):
+    return self.count
+
+  def __contains__(self, word):
+    h1, h2 = self.hashes(word)
+    n_bits, bits = self.n_bits, self.bits
+    for _ in range(self.n_hashes): #the positions are h1, h1 + h2, h1 + 2*h2...
+      if not bits[h1 >> 3] & (1 << (h1 & 7)):
+        return False
+      h1 = (h1 + h2) % n_bits
+    return True
+
+  def hashes(self, word):
+    """
+    Returns the two hashes of a string that the positions of its bits are 
+    derived from, both are smaller than n_bits
+
+        Parameters
+        ----------
+        word : str
+            a string
+
+        Returns
+        -------
+        h1 : int
+            the position of the first bit
+        h2 : int
+            the distance between the positions
+    """
+    digest = hashlib.blake2b(word.encode("utf8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little") % self.n_bits, int.from_bytes(digest[8:], "little") % self.n_bits
+
+  def add(self, word):
+    """
+    Adds a string to the filter
+
+        Parameters
+        ----------
+        word : str
+            a string
+
+        Returns
+        -------
+        None
+    """
+    h1, h2 = self.hashes(word)
+    for _ in range(self.n_hashes):
+      self.bits[h1 >> 3] |= 1 << (h1 & 7)
+      h1 = (h1 + h2) % self.n_bits
+    self.count += 1
+
+  def update(self, words):
+    """
+    Adds strings to the filter. If NumPy is installed, the positions of the 
+    bits of a chunk of strings are calculated and set together
+
+        Parameters
+        ----------
+        words : iterable
+            the strings
+
+        Returns
+        -------
+        None
+    """
+    if np is None:
+      for word in words:
+        self.add(word)
+      return
+    bits = np.frombuffer(self.bits, dtype=np.uint8) #a view, the bytes of the filter are set in place
+    steps = np.arange(self.n_hashes, dtype=np.uint64)
+    words = iter(words)
+    while True:
+      chunk = list(itertools.islice(words, self.chunk_size))
+      if not chunk:
+        return
+      digests = b"".join(hashlib.blake2b(word.encode("utf8"), digest_size=16).digest() for word in chunk)
+      hashes = np.frombuffer(digests, dtype="<u8").reshape(-1, 2) % np.uint64(self.n_bits)
+      positions = (hashes[:, :1] + steps * hashes[:, 1:]) % np.uint64(self.n_bits) #the same positions as in add, the products stay far below 2**64
+      np.bitwise_or.at(bits, (positions >> np.uint64(3)).ravel(), (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)).ravel())
+      self.count += len(chunk)
+
+  def pack(self):
+    """
+    Returns the filter as a dictionary that can be stored on disk
+
+        Returns
+        -------
+        data : dict
+            the sizes and the bytes of the filter
+    """
+    return {"n_bits": self.n_bits, "n_hashes": self.n_hashes, "count": self.count, "bits": bytes(self.bits)}
+
+  @classmethod
+  def unpack(cls, data):
+    """
+    Builds a filter from the dictionary that is returned by pack
+
+        Parameters
+        ----------
+        data : dict
+            a dictionary that is returned by pack
+
+        Returns
+        -------
+        index : Bloom_filter
+            a filter that has the same bits as the packed one
+    """
+    index = cls.__new__(cls)
+    index.n_bits, index.n_hashes, index.count = data["n_bits"], data["n_hashes"], data["count"]
+    index.bits = bytearray(data["bits"])
+    return index
+
+class Lexicon():
+  """
+  An index of the existing words of a language and a hash index of the unique 
+  stems that are extracted from them. The existing words, with all their 
+  inflected forms in the database, are stored in a Bloom filter, so checking 
+  whether a word exists takes constant time and the index stays small. A 
+  pseudoword is very rarely taken for an existing word (with the probability
+  error_rate), an existing word is never taken for a pseudoword. The stems 
+  that are kept for training must be existing words exactly, so they are 
+  checked against a set of the words that is only kept while the database is
+  stemmed.
+
+    ...
+
+    Attributes
+    ----------
+    words : Corpus or list
+        the existing words in a language, they are read when the index is 
+        built
+    index : Bloom_filter or None
+        the index of the existing words, None until it is built or loaded
+    exact : frozenset or None
+        the existing words, None when the database is not being stemmed
+    stems : dict
+        the unique stems in the order they are added, the values are not used
+
+    Methods
+    -------
+    build():
+        builds the index of the existing words if it is not built yet
+    is_word(word):
+        checks whether a word is an existing word
+    exact_words():
+        builds the set of the existing words if it is not built yet
+    release():
+        drops the set of the existing words
+    exists(word):
+        checks exactly whether a word is an existing word
+    add_stem(stem):
+        adds a stem if it was not added before
+  """
+  error_rate = 0.0001 #the probability that a pseudoword is found in the index
+
+  def __init__(self, words):
+    """
+    Constructs the lexicon, the index of the existing words is built when it 
+    is first used
+
+        Parameters
+        ----------
+        words : Corpus or list
+            the existing words in a language
+    """
+    self.words = words
+    self.index = None #built by build or loaded from the cache
+    self.exact = None #built by exact_words for stemming
+    self.stems = {} #a dictionary is used as an insertion-ordered set
+
+  def __contains__(self, word):
+    return word in self.build()
+
+  def __len__(self):
+    return len(self.build())
+
+  def build(self):
+    """
+    Builds the index of the existing words if it is not built or loaded yet
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        index : Bloom_filter
+            the index of the existing words
+    """
+    if self.index is None:
+      index = Bloom_filter(len(self.words), self.error_rate)
+      index.update(self.words)
+      self.index = index
+    return self.index
+
+  def is_word(self, word):
+    """
+    Checks whether a word (or a pseudoword) is an existing word of the language
+
+        Parameters
+        ----------
+        word : str
+            a word
+
+        Returns
+        -------
+        bool
+            True if the word exists in the database
+    """
+    return word in self.build()
+
+  def exact_words(self):
+    """
+    Builds the set of the existing words if it is not built yet, it is much 
+    larger than the index, so it is dropped by release after stemming
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        exact : frozenset
+            the existing words
+    """
+    if self.exact is None:
+      self.exact = frozenset(self.words)
+    return self.exact
+
+  def release(self):
+    """
+    Drops the set of the existing words
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+    """
+    self.exact = None
+
+  def exists(self, word):
+    """
+    Checks exactly whether a word is an existing word of the language, for the
+    stems that the model is trained on
+
+        Parameters
+        ----------
+        word : str
+            a word
+
+        Returns
+        -------
+        bool
+            True if the word exists in the database
+    """
+    return word in self.exact_words()
+
+  def add_stem(self, stem):
+    """
+    Adds a stem to the unique stems
+
+        Parameters
+        ----------
+        stem : str
+            a stem
+
+        Returns
+        -------
+        bool
+            True if the stem was not added before
+    """
+    if stem in self.stems:
+      return False
+    self.stems[stem] = None
+    return True
+
+class Model_cache():
+  """
+  A directory of trained models on disk. A model is stored under a key that 
+  depends on the content of the database, the language, the version of the 
+  stemmer and the number of stemmed words, so a stored model is only used when 
+  all of them are the same.
+
+  A file starts with a JSON header in its first line that lists the fields of
+  the stored data, followed by the raw bytes of the arrays and the strings in
+  the order of the header. Nothing in a file is executed when it is loaded, 
+  so a cache directory can be shared, and a file that cannot be read is 
+  treated as a missing model.
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        the directory where the models are stored
+
+    Methods
+    -------
+    key(filename, language, stemmer_version, limit, order=2):
+        calculates the key of a model
+    load(key):
+        loads the stems, the model and the index of the existing words that
+        are stored under a key
+    save(key, stems, model, index=None):
+        stores the stems, the model and the index of the existing words under
+        a key
+    encode(data):
+        returns the header and the sections of a dictionary of data
+    decode(file):
+        reads a dictionary of data that is written by save
+  """
+  version = 4 #increased when the format of the stored models changes
+  max_header = 1 << 20 #the largest header that is read, in bytes
+
+  def __init__(self, directory):
+    """
+    Constructs the cache, the directory is created if it does not exist
+
+        Parameters
+        ----------
+        directory : str
+            the directory where the models are stored
+    """
+    self.directory = directory
+    os.makedirs(directory, exist_ok=True)
+
+  def key(self, filename, language, stemmer_version, limit, order=2):
+    """
+    Calculates the key of a model
+
+        Parameters
+        ----------
+        filename : str
+            name of the database that the model is trained on
+        language : str
+            the language of the model
+        stemmer_version : str
+            the version of the stemmer that is used for the database
+        limit : int or None
+            the number of stemmed words
+        order : int, optional
+            the order of the model, the default value is 2
+
+        Returns
+        -------
+        key : str
+            a hexadecimal key
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+      for chunk in iter(lambda: file.read(1 << 20), b""):
+        digest.update(chunk)
+    corpus = digest.hexdigest()
+    return hashlib.sha256(repr((self.version, corpus, language, stemmer_version, limit, order)).encode("utf8")).hexdigest()
+
+  def path(self, key):
+    return os.path.join(self.directory, key + ".model")
+
+  def load(self, key):
+    """
+    Loads the stems, the model and the index of the existing words that are 
+    stored under a key
+
+        Parameters
+        ----------
+        key : str
+            the key of the model
+
+        Returns
+        -------
+        stems : list or None
+            the stems that the model is trained on, None if there is no model 
+            stored under the key
+        model : Transition_model or None
+            the model, it still needs to be normalized
+        index : Bloom_filter or None
+            the index of the existing words, None if it was not stored
+    """
+    try:
+      with open(self.path(key), "rb") as file:
+        data = self.decode(file)
+      stems = data["stems"].split("\n") if data["stems"] else []
+      index = Bloom_filter.unpack(data["lexicon"]) if data.get("lexicon") else None
+      model = Transition_model.unpack(data["model"])
+    except (OSError, EOFError, ValueError, KeyError, TypeError, IndexError, AttributeError, OverflowError): #a damaged or foreign file is rebuilt
+      return None, None, None
+    return stems, model, index
+
+  def save(self, key, stems, model, index=None):
+    """
+    Stores the stems, the model and the index of the existing words under a 
+    key, the file is replaced at once so that a model that is being written is
+    never read
+
+        Parameters
+        ----------
+        key : str
+            the key of the model
+        stems : list
+            the stems that the model is trained on
+        model : Transition_model
+            the trained model
+        index : Bloom_filter, optional
+            the index of the existing words, it is not stored by default
+
+        Returns
+        -------
+        None
+    """
+    header, sections = self.encode({"stems": "\n".join(stems), "model": model.pack(), "lexicon": index.pack() if index is not None else None})
+    tmp = self.path(key) + ".%d.tmp" % os.getpid()
+    try:
+      with open(tmp, "wb") as file:
+        file.write(json.dumps(header).encode("utf8") + b"\n")
+        file.writelines(sections)
+      os.replace(tmp, self.path(key))
+    except BaseException:
+      if os.path.exists(tmp): #a file that is not complete is never left behind
+        os.remove(tmp)
+      raise
+
+  def encode(self, data):
+    """
+    Returns the header and the sections of a dictionary of data. The nested 
+    dictionaries are flattened into fields with dotted names, the integers and
+    None are stored in the header, the strings, bytes and arrays in sections
+
+        Parameters
+        ----------
+        data : dict
+            a dictionary of dictionaries, strings, bytes, arrays, integers and
+            None
+
+        Returns
+        -------
+        header : dict
+            the version, the byte order and the fields: the name, the type, 
+            the value or the typecode and the size of every field
+        sections : list
+            the bytes of the fields that are not in the header
+    """
+    fields = []
+    sections = []
+    stack = [("", data)]
+    while stack:
+      prefix, values = stack.pop()
+      for name, value in values.items():
+        name = prefix + name
+        if isinstance(value, dict):
+          stack.append((name + ".", value))
+        elif isinstance(value, array):
+          fields.append([name, "array", value.typecode, value.itemsize, len(value) * value.itemsize])
+          sections.append(value.tobytes())
+        elif isinstance(value, str):
+          sections.append(value.encode("utf8"))
+          fields.append([name, "str", None, 1, len(sections[-1])])
+        elif isinstance(value, (bytes, bytearray)):
+          fields.append([name, "bytes", None, 1, len(value)])
+          sections.append(bytes(value))
+        elif value is None or isinstance(value, int):
+          fields.append([name, "value", value, 0, 0])
+        else:
+          raise TypeError("%s of type %s cannot be stored in the cache" % (name, type(value).__name__))
+    return {"version": self.version, "byteorder": sys.byteorder, "fields": fields}, sections
+
+  def decode(self, file):
+    """
+    Reads a dictionary of data that is written by save
+
+        Parameters
+        ----------
+        file : file object
+            a binary file, positioned at the header
+
+        Returns
+        -------
+        data : dict
+            the dictionary that was encoded, with the same nesting
+    """
+    line = file.readline(self.max_header)
+    if not line.endswith(b"\n"):
+      raise ValueError("the header of the cache file is missing or too long")
+    header = json.loads(line)
+    if header["version"] != self.version:
+      raise ValueError("the cache file has version %r" % header["version"])
+    data = {}
+    for name, kind, value, itemsize, size in header["fields"]:
+      if kind != "value":
+        raw = file.read(size)
+        if len(raw) != size:
+          raise EOFError("the cache file is truncated")
+        if kind == "array":
+          value = array(value)
+          if value.itemsize != itemsize: #the sizes of the C types differ on this platform
+            raise ValueError("the arrays of the cache file have other item sizes")
+          value.frombytes(raw)
+          if header["byteorder"] != sys.byteorder:
+            value.byteswap()
+        elif kind == "str":
+          value = raw.decode("utf8")
+        elif kind == "bytes":
+          value = raw
+        else:
+          raise ValueError("unknown field type %r" % kind)
+      *parents, leaf = name.split(".")
+      node = data
+      for parent in parents:
+        node = node.setdefault(parent, {})
+      node[leaf] = value
+    return data
+
+class Metrics():
+  """
+  The instrumentation hook of the pipeline. The stages of the pipeline report
+  their wall time, the number of calls and of processed items, and the counts
+  of their events (rejected words, dead ends...) to it. This class is the 
+  default and ignores everything, so the pipeline pays almost nothing for the
+  hook, Metrics_recorder records the reports. The shards of the worker 
+  processes are recorded in the workers and merged into the hook of the main
+  process, so the seconds of a stage are summed over the processes.
+    ...
+
+    Attributes
+    ----------
+    enabled : bool
+        whether the reports are recorded, the stages skip their bookkeeping if
+        they are not
+
+    Methods
+    -------
+    timer(stage, items=0):
+        returns a context manager that times a call of a stage
+    count(stage, event, n=1):
+        counts the events of a stage
+    merge(stages):
+        adds the records of another recorder
+  """
+  enabled = False
+  stages = None #the records, kept only by Metrics_recorder
+
+  def timer(self, stage, items=0):
+    """
+    Returns a context manager that times a call of a stage
+
+        Parameters
+        ----------
+        stage : str
+            the name of the stage
+        items : int, optional
+            number of items that the call processes, the default value is 0
+
+        Returns
+        -------
+        timer : context manager
+            a context manager around the call
+    """
+    return contextlib.nullcontext()
+
+  def count(self, stage, event, n=1):
+    """
+    Counts the events of a stage
+
+        Parameters
+        ----------
+        stage : str
+            the name of the stage
+        event : str
+            the name of the event
+        n : int, optional
+            number of events, the default value is 1
+
+        Returns
+        -------
+        None
+    """
+
+  def merge(self, stages):
+    """
+    Adds the records of another recorder, e.g. of a worker process
+
+        Parameters
+        ----------
+        stages : dict or None
+            the stages of the other recorder, None if it did not record
+
+        Returns
+        -------
+        None
+    """
+
+class Metrics_recorder(Metrics):
+  """
+  A Metrics hook that records the wall time, the calls, the items and the 
+  events of every stage, and exports them as a JSON report or in the text 
+  format of Prometheus.
+    ...
+
+    Attributes
+    ----------
+    stages : dict
+        a dictionary that has the names of the stages as keys and dictionaries
+        of their seconds, calls, items and events as values
+
+    Methods
+    -------
+    stage(stage):
+        returns the record of a stage, an empty one is added if it is new
+    timer(stage, items=0):
+        returns a context manager that times a call of a stage
+    count(stage, event, n=1):
+        counts the events of a stage
+    merge(stages):
+        adds the records of another recorder
+    report():
+        returns the records as a dictionary
+    prometheus(prefix="jabberwocky"):
+        returns the records in the text format of Prometheus
+    write(filename):
+        writes the records to a file
+  """
+  enabled = True
+
+  def __init__(self):
+    """
+    Constructs an empty recorder
+    """
+    self.stages = {}
+
+  def stage(self, stage):
+    record = self.stages.get(stage)
+    if record is None:
+      record = self.stages[stage] = {"seconds": 0.0, "calls": 0, "items": 0, "events": {}}
+    return record
+
+  @contextlib.contextmanager
+  def timer(self, stage, items=0):
+    record = self.stage(stage)
+    start = time.perf_counter()
+    try:
+      yield record
+    finally:
+      record["seconds"] += time.perf_counter() - start
+      record["calls"] += 1
+      record["items"] += items
+
+  def count(self, stage, event, n=1):
+    events = self.stage(stage)["events"]
+    events[event] = events.get(event, 0) + n
+
+  def merge(self, stages):
+    for stage, other in (stages or {}).items():
+      record = self.stage(stage)
+      for key in ("seconds", "calls", "items"):
+        record[key] += other[key]
+      for event, n in other["events"].items():
+        self.count(stage, event, n)
+
+  def report(self):
+    """
+    Returns the records, with the throughput of every stage
+
+        Returns
+        -------
+        report : dict
+            a dictionary that can be written as JSON
+    """
+    stages = {}
+    for stage, record in self.stages.items():
+      stages[stage] = dict(record, events=dict(record["events"]), items_per_second=record["items"] / record["seconds"] if record["seconds"] else None)
+    return {"stages": stages}
+
+  def prometheus(self, prefix="jabberwocky"):
+    """
+    Returns the records in the text format of Prometheus, every record is a 
+    counter with the label stage (and event)
+
+        Parameters
+        ----------
+        prefix : str, optional
+            the prefix of the names of the metrics, the default value is 
+            "jabberwocky"
+
+        Returns
+        -------
+        text : str
+            the metrics, one sample on every line
+    """
+    lines = []
+    for name, key, text in (("stage_seconds_total", "seconds", "Wall time spent in a stage"),
+                            ("stage_calls_total", "calls", "Calls of a stage"),
+                            ("stage_items_total", "items", "Items processed by a stage")):
+      lines.append("# HELP %s_%s %s" % (prefix, name, text))
+      lines.append("# TYPE %s_%s counter" % (prefix, name))
+      for stage, record in self.stages.items():
+        lines.append('%s_%s{stage="%s"} %r' % (prefix, name, stage, record[key]))
+    lines.append("# HELP %s_events_total Events of a stage" % prefix)
+    lines.append("# TYPE %s_events_total counter" % prefix)
+    for stage, record in self.stages.items():
+      for event, n in record["events"].items():
+        lines.append('%s_events_total{stage="%s",event="%s"} %d' % (prefix, stage, event, n))
+    return "\n".join(lines) + "\n"
+
+  def write(self, filename):
+    """
+    Writes the records to a file, in the text format of Prometheus if the 
+    name of the file ends with .prom, as JSON otherwise
+
+        Parameters
+        ----------
+        filename : str
+            name of the file
+
+        Returns
+        -------
+        None
+    """
+    with open(filename, "w", encoding="utf8") as file:
+      if filename.endswith(".prom"):
+        file.write(self.prometheus())
+      else:
+        json.dump(self.report(), file, indent=2)
 
 class Pseudoword_gen():
     
@@ -20,112 +2063,608 @@ class Pseudoword_gen():
   A class that generates pseudowords and Jabberwocky sentences depending on the 
   sound probabilities in a language determined by the words in a given database.
 
-    ...
+    ...
+
+    Attributes
+    ----------
+    filename : str
+        name of the database that has the existing words in a language
+    n_words : int, optional
+        number of the pseudowords to be generated, the default value is 300
+    n_sent : int, optional
+        number of Jabberwocky sentences to be generated, the default value is 5
+    limit : int, optional
+        number of words from the beginning of the database that are stemmed, 
+        the whole database is used by default
+    cache_dir : str, optional
+        directory where the trained models are stored, the models are not 
+        stored by default
+    workers : int, optional
+        number of processes that stem the database and count the syllables,
+        the default value is 1
+    order : int, optional
+        the order of the syllable model, the default value is 2
+    seed : int, random.Random or numpy.random.Generator, optional
+        the seed of the random generator, a random seed is used by default
+    metrics : Metrics, optional
+        the hook that the stages report their times and events to
+
+    Methods
+    -------
+    probabilities(syllables):
+        creates a transition model that contains the probabilities of 
+        different syllables following each other, and calculates the probability 
+        of different syllables occuring as the first syllable, it requires a 
+        list of lists that contains the syllables of words in the language
+    stemming():
+        stems the database and returns the unique stems, the work is shared by
+        the worker processes
+    counting(stems):
+        separates the stems into syllables and counts the syllable transitions,
+        the work is shared by the worker processes
+    train():
+        stems the database and trains the transition model, or loads them from
+        the cache if the database was already trained on
+    build_lexicon():
+        builds the index of the existing words that the pseudowords are 
+        checked against
+    pseudostems(n, plen):
+        creates random sequences of syllables according to the trained model
+    unique_pseudowords(n, plen, candidate):
+        draws pseudostems until there are n unique pseudowords that are not
+        existing words
+    iter_sentences(n=None, ordered=True, records=False):
+        yields Jabberwocky sentences one by one, the sentences are generated
+        in shards by the worker processes
+    sentence_shard(categories, seed, n, records=False):
+        returns the sentences of a shard
+    pseudoword_shard(n, seed):
+        creates n pseudowords with the random stream of a shard
+    spawn(n):
+        derives the seeds of n independent random streams for the workers
+    pool(categories=None):
+        starts the worker processes
+  
+  """
+  language = None #the name of the language, set by the daughter classes
+  batch_size = 10000 #number of the pseudostems that are generated at once with NumPy
+  shard_size = 100000 #number of the sentences in a shard
+  retry_budget = 20 #number of the pseudostems that can be drawn for every requested pseudoword
+  stemmer_dist = None #the name of the package of the stemmer, set by the daughter classes
+  
+  def __init__(self, filename, n_words, n_sent, limit=None, cache_dir=None, workers=1, order=2, seed=None, metrics=None):
+
+    """
+    Constructs all the necessary attributes for the Pseudoword_gen object, maps
+    the database that has the existing words into memory and indexes the words
+
+        Parameters
+        ----------
+        filename : str
+            name of the database that has the existing words in a language
+        n_words : int
+            number of the pseudowords to be generated, the default value is 300
+        n_sent : int
+            number of Jabberwocky sentences to be generated, the default value 
+            is 5
+        limit : int, optional
+            number of words from the beginning of the database that are 
+            stemmed, the whole database is used by default
+        cache_dir : str, optional
+            directory where the trained models are stored, the models are not
+            stored by default
+        workers : int, optional
+            number of processes that stem the database and count the 
+            syllables, the default value is 1
+        order : int, optional
+            the order of the syllable model, 2 for syllable pairs, 3 for 
+            syllable triples..., the default value is 2
+        seed : int, random.Random or numpy.random.Generator, optional
+            the seed of the random generator, all the random choices are made
+            with it, so the same seed gives the same pseudowords and 
+            sentences, a random seed is used by default
+        metrics : Metrics, optional
+            the hook that the stages report their times and events to, they 
+            are not recorded by default
+    """
+    self.filename = filename
+    self.words = Corpus(filename) #the lines are decoded only when they are read
+    self.lexicon = Lexicon(self.words) #to check in constant time whether a word exists, the index is built when it is first used
+    self.n_words = n_words #number of words to generate
+    self.n_sent = n_sent #number of sentences to generate
+    self.limit = limit #number of words to stem, None for the whole database
+    self.cache = Model_cache(cache_dir) if cache_dir else None
+    self.workers = workers #number of processes for stemming and counting
+    self.order = order #the order of the syllable model
+    self.rng = make_rng(seed) #all the random choices are made with this generator
+    self.metrics = metrics if metrics is not None else Metrics() #the stages are not recorded by default
+    self.stems = [] #filled by train
+    self.model = None #filled by train
+    self.stemmer = None #created once in every process by stem_words
+    self.batch_generator = None #created from the model by pseudostems
+    self.acceptance_rate = None #the share of the pseudostems that became pseudowords, set by unique_pseudowords
+
+  def probabilities(self, syllables):
+    """
+    Creates a transition model that contains the probabilities of different 
+    syllables following each other, and calculates the probability of different 
+    syllables occuring as the first syllable, it requires a list of lists that
+    contains the syllables of words in the language
+
+        Parameters
+        ----------
+        syllables : list or ukrsyllab.SyllableBatch
+            a list of lists that contains syllables of different words in a 
+            language, or the syllables of the words in flat arrays
+
+        Returns
+        -------
+        model : Transition_model
+            a sparse model that contains the probability of a syllable 
+            following another one and the probability of different syllables
+            being the initial syllable
+    """
+    model = Transition_model(self.order) #an empty model to store the syllables and the counts of the syllables following them
+    model.add_words(syllables)
+    model.normalize(len(self.stems)) #the counts are turned into probabilities only once, after all the words are counted
+    return model
+
+  def stemmer_version(self):
+    """
+    Returns the version of the stemmer package, it is a part of the cache key 
+    because a different stemmer can give different stems
+
+        Returns
+        -------
+        version : str
+            the version of the stemmer package, "unknown" if it cannot be found
+    """
+    try:
+      return metadata.version(self.stemmer_dist)
+    except (metadata.PackageNotFoundError, ValueError, TypeError):
+      return "unknown"
+
+  def shards(self, n):
+    """
+    Splits the range of n items into consequative shards, a few shards for 
+    every worker so that the workers that finish early can take another one
+
+        Parameters
+        ----------
+        n : int
+            number of items
+
+        Returns
+        -------
+        shards : list
+            a list of (start, stop) tuples in order
+    """
+    size = max(1, -(-n // (self.workers * 4)))
+    return [(start, min(start + size, n)) for start in range(0, n, size)]
+
+  def stemming(self):
+    """
+    Removes any inflectional suffix from the words in the database and returns 
+    the unique stems. If there is more than one worker, the database is split 
+    into shards that are stemmed by the worker processes, and the stems of the 
+    shards are merged in the order of the shards, so the result does not 
+    depend on the number of workers
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        stems : list
+            a list of unique stems
+    """
+    n = len(self.words) if self.limit is None else min(self.limit, len(self.words))
+    with self.metrics.timer("exact_words", items=len(self.words)): #timed on its own, so the stem stage is the same with any number of workers
+      self.lexicon.exact_words() #built before the workers start, so they share it
+    if self.workers <= 1:
+      with self.metrics.timer("stem", items=n):
+        results = [self.stem_words(self.words.lines(0, n))]
+    else: #the workers get line ranges and read them from their own mapping of the database, and time the shards
+      results = []
+      with self.pool() as pool:
+        for stems, stages in pool.map(_stem_shard, self.shards(n)):
+          self.metrics.merge(stages)
+          results.append(stems)
+    for stems in results:
+      for stem in stems:
+        self.lexicon.add_stem(stem) #To avoid appending the same words
+    self.lexicon.release()
+    return list(self.lexicon.stems)
+
+  def counting(self, stems):
+    """
+    Separates the stems into syllables and counts the syllable transitions. If 
+    there is more than one worker, every worker counts a shard of the stems 
+    and the counts are merged in the order of the shards
+
+        Parameters
+        ----------
+        stems : list
+            a list of unique stems
+
+        Returns
+        -------
+        model : Transition_model
+            a model that has the counts, it still needs to be normalized
+    """
+    model = Transition_model(self.order)
+    if self.workers > 1: #the workers syllabify and count the shards, and time them
+      shards = [stems[start:stop] for start, stop in self.shards(len(stems))]
+      with self.pool() as pool:
+        for data, stages in pool.map(_count_shard, shards):
+          self.metrics.merge(stages)
+          model.merge(data)
+    else:
+      with self.metrics.timer("syllabify", items=len(stems)):
+        syllables = self.syllabification(stems)
+      with self.metrics.timer("count", items=len(stems)):
+        model.add_words(syllables)
+    return model
+
+  def train(self):
+    """
+    Stems the database, separates the stems into syllables and trains the 
+    transition model. If a cache directory is given and the same database was 
+    already trained on with the same settings, the stems, the model and the 
+    index of the existing words are loaded from the cache instead, otherwise
+    they are stored in it
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        model : Transition_model
+            the trained model
+    """
+    if self.model is not None: #the model is trained only once
+      return self.model
+    key = None
+    if self.cache is not None:
+      key = self.cache.key(self.filename, self.language, self.stemmer_version(), self.limit, self.order)
+      stems, model, index = self.cache.load(key)
+      self.metrics.count("train", "cache_misses" if model is None else "cache_hits")
+      if model is not None:
+        self.stems = stems
+        if index is not None and self.lexicon.index is None: #the database does not need to be read for the index
+          self.lexicon.index = index
+        with self.metrics.timer("normalize", items=len(model.syllables)):
+          model.normalize(len(stems))
+        self.model = model
+        return model
+    self.stems = self.stemming()
+    self.model = self.counting(self.stems)
+    with self.metrics.timer("normalize", items=len(self.model.syllables)):
+      self.model.normalize(len(self.stems)) #the counts are turned into probabilities only once, after all the words are counted
+    if key is not None:
+      self.cache.save(key, self.stems, self.model, self.build_lexicon())
+    return self.model
+
+  def build_lexicon(self):
+    """
+    Builds the index of the existing words that the pseudowords are checked
+    against, if it is not built or loaded from the cache yet
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        index : Bloom_filter
+            the index of the existing words
+    """
+    if self.lexicon.index is None:
+      with self.metrics.timer("lexicon", items=len(self.words)):
+        self.lexicon.build()
+    return self.lexicon.index
+
+  def pseudostems(self, n, plen):
+    """
+    Creates random sequences of syllables according to the trained model. If
+    NumPy is installed and the model is of order 2, the sequences are 
+    generated in batches of batch_size with a Batch_generator, otherwise one 
+    by one
+
+        Parameters
+        ----------
+        n : int
+            number of the sequences
+        plen : int
+            the length of a sequence in letters
+
+        Yields
+        ------
+        pword : list
+            a list of syllables
+    """
+    model = self.train()
+    if np is None or model.order > 2: #the batches only use the syllable pairs
+      for _ in range(n):
+        yield model.walk(plen, self.rng)
+      return
+    if self.batch_generator is None:
+      self.batch_generator = Batch_generator(model)
+    rng = np.random.default_rng(self.rng.getrandbits(64)) #seeded from the generator of the object, so its seed is enough for reproducible pseudostems
+    for start in range(0, n, self.batch_size):
+      yield from self.batch_generator.walks(min(self.batch_size, n - start), plen, rng)
+
+  def unique_pseudowords(self, n, plen, candidate):
+    """
+    Draws pseudostems until there are n unique pseudowords, the pseudostems 
+    that are rejected by the language, repeated or existing words of the 
+    database are replaced by new ones. The pseudostems are drawn in rounds, 
+    every round draws as many as the acceptance rate so far needs for the 
+    missing pseudowords. At most retry_budget pseudostems are drawn for every 
+    requested pseudoword, so a model that cannot create enough different 
+    pseudowords does not loop forever
+
+        Parameters
+        ----------
+        n : int
+            number of the pseudowords
+        plen : int
+            the length of a pseudostem in letters
+        candidate : function
+            turns the syllables of a pseudostem into a pseudoword, it returns
+            None if the pseudostem is rejected
+
+        Returns
+        -------
+        p_words : list
+            a list of n unique pseudowords, fewer only if the retry budget is
+            spent
+    """
+    p_words = []
+    seen = set() #the accepted pseudowords
+    budget = n * self.retry_budget
+    attempts = dead_ends = rejected = duplicates = collisions = 0
+    self.train() #the model and the index are ready before the stage is timed
+    self.build_lexicon()
+    with self.metrics.timer("pseudowords", items=n):
+      while len(p_words) < n and attempts < budget:
+        missing = n - len(p_words)
+        draw = missing * attempts // len(p_words) + 1 if p_words else missing #the expected number of pseudostems for the missing pseudowords
+        for syllables in self.pseudostems(min(draw, budget - attempts), plen):
+          attempts += 1
+          if sum(map(len, syllables)) < plen: #the sequence ended with a syllable that is never followed by another one
+            dead_ends += 1
+          pword = candidate(syllables)
+          if pword is None:
+            rejected += 1
+          elif pword in seen:
+            duplicates += 1
+          elif self.lexicon.is_word(pword): #a pseudoword must not be an existing word
+            collisions += 1
+          else:
+            seen.add(pword)
+            p_words.append(pword)
+            if len(p_words) == n:
+              break
+    self.acceptance_rate = len(p_words) / attempts if attempts else None
+    if len(p_words) < n:
+      warnings.warn("only %d of %d pseudowords were created, the retry budget of %d pseudostems was spent" % (len(p_words), n, budget))
+    if self.metrics.enabled:
+      for event, count in (("attempts", attempts), ("retries", attempts - len(p_words)), ("dead_ends", dead_ends), ("rejected", rejected), ("duplicates", duplicates), ("lexicon_collisions", collisions)):
+        self.metrics.count("pseudowords", event, count)
+    return p_words
+
+  def iter_sentences(self, n=None, ordered=True, records=False):
+    """
+    Creates the pseudowords, assigns them to syntactical categories and yields
+    Jabberwocky sentences one by one, so the sentences are never stored 
+    together in memory. 
+    
+    If the number of sentences is given, they are generated in shards of 
+    shard_size sentences, every shard with its own random stream that is 
+    spawned from the generator of the object. If there is more than one 
+    worker, the shards are generated by the worker processes, a few shards 
+    for every worker at a time, and the sentences of a shard are yielded when
+    it is finished. The shards are yielded in order by default, so a seeded 
+    run gives the same sentences with any number of workers. 
+
+        Parameters
+        ----------
+        n : int, optional
+            number of sentences to be generated, the sentences are generated 
+            without an end by default
+        ordered : bool, optional
+            whether the shards are yielded in order or as soon as they are 
+            finished, the default value is True
+        records : bool, optional
+            whether the sentences are yielded with their structure, as they
+            are returned by sent_record, the default value is False. The 
+            same seed gives the same sentences in both cases
+
+        Yields
+        ------
+        sent : str or dict
+            a Jabberwocky sentence, or its record
+    """
+    p_words = self.pseudowords()
+    with self.metrics.timer("categorize", items=len(p_words)):
+      word_categories = self.categorize(p_words) #to assign syntactic categories to the pseudowords
+    if n is None:
+      sentence = self.sent_record if records else self.sent_generator
+      while True:
+        yield sentence(word_categories)
+    shards = [(seed, min(self.shard_size, n - start), records) for seed, start in zip(self.spawn(-(-n // self.shard_size)), range(0, n, self.shard_size))]
+    if self.workers <= 1:
+      for seed, size, records in shards:
+        yield from self.sentence_shard(word_categories, seed, size, records)
+      return
+    with self.pool(word_categories) as pool:
+      pending = collections.deque() #the shards that are submitted and not yielded yet
+      shards = iter(shards)
+      for shard in itertools.islice(shards, self.workers * 2):
+        pending.append(pool.submit(_sentence_shard, shard))
+      while pending:
+        if ordered:
+          done = pending.popleft()
+        else:
+          done = next(iter(wait(pending, return_when=FIRST_COMPLETED)[0]))
+          pending.remove(done)
+        for shard in itertools.islice(shards, 1): #a new shard is submitted for every finished one
+          pending.append(pool.submit(_sentence_shard, shard))
+        sentences, stages = done.result()
+        self.metrics.merge(stages)
+        yield from sentences
+
+  def sentence_shard(self, categories, seed, n, records=False):
+    """
+    Returns the sentences of a shard, the random choices of the shard are made
+    with its own generator
+
+        Parameters
+        ----------
+        categories : dict
+            the pseudowords of the syntactical categories, as they are 
+            returned by categorize
+        seed : int
+            the seed of the random stream of the shard
+        n : int
+            number of sentences
+        records : bool, optional
+            whether the records of the sentences are returned, the default 
+            value is False
 
-    Attributes
-    ----------
-    filename : str
-        name of the database that has the existing words in a language
-    n_words : int, optional
-        number of the pseudowords to be generated, the default value is 300
-    n_sent : int, optional
-        number of Jabberwocky sentences to be generated, the default value is 5
+        Returns
+        -------
+        sentences : list
+            a list of n Jabberwocky sentences, or of their records
+    """
+    shard = copy.copy(self) #a shallow copy shares the model, only the random generator is replaced
+    shard.rng = random.Random(seed)
+    sentence = shard.sent_record if records else shard.sent_generator
+    with self.metrics.timer("assemble", items=n):
+      return [sentence(categories) for _ in range(n)]
 
-    Methods
-    -------
-    probabilities(syllables):
-        creates a dictionary that contains the probabilities of 
-        different syllables following each other, and calculates the probability 
-        of different syllables occuring as the first syllable, it requires a 
-        list of lists that contains the syllables of words in the language
-  
-  """
-  
-  def __init__(self, filename, n_words, n_sent):
+  def pseudoword_shard(self, n, seed):
+    """
+    Creates n pseudowords with their own random stream, the trained model is
+    shared
+
+        Parameters
+        ----------
+        n : int
+            number of pseudowords
+        seed : int
+            the seed of the random stream of the shard
 
+        Returns
+        -------
+        p_words : list
+            a list of n unique pseudowords, fewer only if the retry budget is 
+            spent
+    """
+    shard = copy.copy(self) #a shallow copy shares the model, only the random generator and the number of words are replaced
+    shard.rng = random.Random(seed)
+    shard.n_words = n
+    p_words = shard.pseudowords()
+    self.batch_generator = shard.batch_generator #the batch generator is built only once
+    self.acceptance_rate = shard.acceptance_rate
+    return p_words
+
+  def spawn(self, n):
     """
-    Constructs all the necessary attributes for the Pseudoword_gen object, opens
-    and reads the database that has the existing words and stores them in a 
-    variable
+    Derives the seeds of n independent random streams from the generator of 
+    the object, for the workers or shards that make random choices in 
+    parallel. The workers create their own generators from the seeds, so a 
+    seeded run gives the same result with any number of processes
 
         Parameters
         ----------
-        filename : str
-            name of the database that has the existing words in a language
-        n_words : int
-            number of the pseudowords to be generated, the default value is 300
-        n_sent : int
-            number of Jabberwocky sentences to be generated, the default value 
-            is 5
+        n : int
+            number of streams
+
+        Returns
+        -------
+        seeds : list
+            n integer seeds
     """
-    file = open(filename, "r", encoding="utf8")
-    self.words = file.read().split("\n")
-    self.n_words = n_words #number of words to generate
-    self.n_sent = n_sent #number of sentences to generate
+    return spawn_seeds(self.rng, n)
 
-  def probabilities(self, syllables):
+  def pool(self, categories=None):
     """
-    Creates a probability dictionary that contains the probabilities of different 
-    syllables following each other, and calculates the probability of different 
-    syllables occuring as the first syllable, it requires a list of lists that
-    contains the syllables of words in the language
+    Starts the worker processes. Where it is possible the processes are 
+    forked, so the generator (with its model) and the categories are shared 
+    with them copy-on-write instead of being pickled
 
         Parameters
         ----------
-        syllables : list
-            a list of lists that contains syllables of different words in a 
-            language
-
-        Returns
-        -------
-        sound_prob : dict
-            a dictionary that contains all probabilities regarding the 
-            probability of a syllable following another one, keys are syllables
-            and values are a list of probabilities
-        in_m : dict
-            a dictionary that contains the probability of different syllables
-            being the initial syllable the keys are syllables and values are
-            the probabilities
-    """
-    sound_prob = {} #an empty dictionary to store syllables and the possibilities of another syllable following them
-    in_m = {} #an empty dictionary to store initial syllables of words and their possibility to appear in the first syllable
-    for s in syllables:
-      i = 0 #index value
-      if len(s) != 1: #if the word has only one syllable, it is not going to be added to the probability
-        if s[i] not in in_m: #if the first syllable is not in the database add it in the database
-          in_m[s[i]] = 1/(len(self.stems)) #divided by the len to normalize the values
-        else:
-          in_m[s[i]] += 1/(len(self.stems))#if it is in the database increase the possibility
-        while i < (len(s) - 1): #while the index is still in the bound of the word
-          b = s[i] #taking two consequative syllables from the word
-          n = s[i+1]
-          if n != "": #in the cases where we have two syllables following each other, (the initial syllable is not the last syllable of the word)
-            if b in sound_prob: #if the first syllable is in the database of syllables
-              if n in sound_prob: #if the second one is in the database as well
-                bInd = list(sound_prob).index(n) #find the index of the second syllable
-                sound_prob[b][bInd] = int(sound_prob[b][bInd]) + 1 #and manipulate the probability value in the row of b that has the index of the following syllable
-              else:
-                probs = len(sound_prob) * "0" #if the second syllable does not exist in the dataset, we need to add it to the matrix and it needs a value row full of 0's (because its frequency with other sounds is 0)
-                sound_prob[n] = list(probs) 
-                for x in sound_prob: sound_prob[x].append(0) #every row of the matrix should be appended with 0 because the new sound that is added is also added as a new column that has never occured with the other sounds before
-                sound_prob[b][-1] = 1 #the last entry of the probability of b should be altered to 1 because the new added sound appeared after that so +1 occurence
-            else:
-              probs = len(sound_prob) * "0" #if b does not exist in the dataset we should add it
-              sound_prob[b] = list(probs)
-              for x in sound_prob: sound_prob[x].append(0)
-              if n in sound_prob:
-                bInd = list(sound_prob).index(n)
-                sound_prob[b][bInd] = int(sound_prob[b][bInd]) + 1
-              else:
-                sound_prob[n] = list(probs)
-                sound_prob[n].append(0)
-                for x in sound_prob: sound_prob[x].append(0)
-                sound_prob[b][-1] = 1
-          i += 1
-    for v in sound_prob.values(): #to turn every value in the dictionary to float
-      for n in range(len(v)):
-        v[n] = float(v[n])/len(sound_prob.keys()) #normalize the probabilities
-    return sound_prob, in_m
+        categories : dict, optional
+            the pseudowords of the syntactical categories, for the workers 
+            that generate sentences
+
+        Returns
+        -------
+        pool : concurrent.futures.ProcessPoolExecutor
+            the pool of workers
+    """
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker, initargs=(self, categories))
+
+_generator = None #the generator of a worker process, set by _init_worker
+_categories = None #the categories of the pseudowords in a worker process, set by _init_worker
+
+def _init_worker(generator, categories=None):
+  """
+  Stores the generator and the categories in a worker process, the stemmer 
+  and the syllabifier that it creates are then used for all the shards of the
+  process
+  """
+  global _generator, _categories
+  _generator = generator
+  _categories = categories
+
+def _shard_metrics():
+  """
+  Gives the generator of a worker process an empty recorder for a shard if 
+  the metrics are recorded, so that every shard returns only its own records
+  """
+  if _generator.metrics.enabled:
+    _generator.metrics = Metrics_recorder()
+  return _generator.metrics
+
+def _stem_shard(bounds):
+  """
+  Stems a shard of the database in a worker process and returns the stems 
+  with the records of the shard
+  """
+  start, stop = bounds
+  metrics = _shard_metrics()
+  with metrics.timer("stem", items=stop - start):
+    stems = _generator.stem_words(_generator.words.lines(start, stop))
+  return stems, metrics.stages
+
+def _sentence_shard(shard):
+  """
+  Generates the sentences of a shard in a worker process and returns them 
+  with the records of the shard
+  """
+  seed, n, records = shard
+  metrics = _shard_metrics()
+  return _generator.sentence_shard(_categories, seed, n, records), metrics.stages
+
+def _count_shard(stems):
+  """
+  Counts the syllable transitions of a shard of the stems in a worker process
+  and returns the packed counts with the records of the shard
+  """
+  metrics = _shard_metrics()
+  model = Transition_model(_generator.order)
+  with metrics.timer("syllabify", items=len(stems)):
+    syllables = _generator.syllabification(stems)
+  with metrics.timer("count", items=len(stems)):
+    model.add_words(syllables)
+  return model.pack(), metrics.stages
 
 class Turkish_jabberwocky(Pseudoword_gen):
   """
@@ -142,20 +2681,41 @@ class Turkish_jabberwocky(Pseudoword_gen):
         number of the pseudowords to be generated, the default value is 300
     n_sent : int, optional
         number of Jabberwocky sentences to be generated, the default value is 5
+    limit : int, optional
+        number of words from the beginning of the database that are stemmed, 
+        the whole database is used by default
+    cache_dir : str, optional
+        directory where the trained models are stored, the models are not 
+        stored by default
+    workers : int, optional
+        number of processes that stem the database and count the syllables,
+        the default value is 1
+    order : int, optional
+        the order of the syllable model, the default value is 2
+    seed : int, random.Random or numpy.random.Generator, optional
+        the seed of the random generator, a random seed is used by default
+    metrics : Metrics, optional
+        the hook that the stages report their times and events to
 
     Methods
     -------
     probabilities(syllables):
-        creates a probability dictionary that contains the probabilities of 
+        creates a transition model that contains the probabilities of 
         different syllables following each other, and calculates the probability 
         of different syllables occuring as the first syllable, it requires a 
         list of lists that contains the syllables of words in the language
+    stem_words(words):
+        removes the inflectional suffixes from a list of words and returns the 
+        unique stems
     syllabification(stem):
         takes a list of Turkish stems and separates them into their syllables 
         and stores them in a list of lists
     vowel_harmony(m1, m2):
         takes two consequative syllables and changes the second one according to
         the rules of Turkish vowel harmony
+    word_classes(w):
+        finds the harmony class of the last vowel and the class of the final 
+        letter of a word
     categorize(pwords):
         takes a list of words and then assigns them into random syntactical 
         categories, adds suffixes according to their categories and stores them 
@@ -164,35 +2724,45 @@ class Turkish_jabberwocky(Pseudoword_gen):
         takes a dictionary that has different syntactical categories as keys and 
         words as values, and picks random words from each category and forms 
         sentences according to the word order of Turkish
+    sent_record(pdic):
+        forms a Jabberwocky sentence like sent_generator and returns it with 
+        its word order and the words of its slots
+    pseudowords():
+        creates Turkish pseudowords according to the probabilities of syllables
+    harmonize(pword):
+        modifies the syllables of a pseudostem according to the rules of vowel
+        harmony and joins them
     run():
         runs the functions in the class in an order to create pseudowords and 
         Jabberwocky sentences in Turkish
   """
-  def __init__(self, filename, n_words, n_sent):
+  language = "turkish"
+  stemmer_dist = "TurkishStemmer"
+  encoder = None #the syllable encoder, created once in every process by syllabification
+
+  def stem_words(self, words):
     """
-    Constructs all the necessary attributes for the Turkish_jabberwocky object, 
-    opens and reads the database that has the existing words and stores them in 
-    a variable. Furthermore, it removes any inflectional suffix from the words
-    and stores the stems in a list.
+    Removes any inflectional suffix from a list of Turkish words and returns 
+    the unique stems
 
         Parameters
         ----------
-        filename : str
-            name of the database that has the existing words in a language
-        n_words : int
-            number of the pseudowords to be generated, the default value is 300
-        n_sent : int
-            number of Jabberwocky sentences to be generated, the default value 
-            is 5
-    """
-    super().__init__(filename, n_words, n_sent)
+        words : list
+            a list of Turkish words
 
-    self.stems = [] #The empty list that will be appended with stems
-    for w in self.words[:50000]: #We are only taking a slice, because the actual database has more than 300.000 words that it takes a lot of time to run.
-      w = TurkishStemmer().stem(w) #Getting the stems of Turkish words 
-      if w in self.words and len(w) != 1 and w.lower() == w: #These two conditions are added because in the database there are proper names that are mostly Arabic that we would like to avoid and there are some one letter words that are not actual words in Turkish, i.e., "a"
-        if w not in self.stems:#To avoid appending the same words
-          self.stems.append(w)
+        Returns
+        -------
+        stems : list
+            a list of unique Turkish stems
+    """
+    if self.stemmer is None: #the stemmer is created once in every process
+      self.stemmer = TurkishStemmer()
+    stems = {} #an insertion-ordered set of the stems
+    for w in words: #the lookups are hashed, so the whole database can be stemmed in linear time
+      w = self.stemmer.stem(w) #Getting the stems of Turkish words 
+      if self.lexicon.exists(w) and len(w) != 1 and w.lower() == w: #These two conditions are added because in the database there are proper names that are mostly Arabic that we would like to avoid and there are some one letter words that are not actual words in Turkish, i.e., "a"
+        stems[w] = None #To avoid appending the same words
+    return list(stems) #The list of unique stems
 
   def syllabification(self, stems):
     """
@@ -210,10 +2780,11 @@ class Turkish_jabberwocky(Pseudoword_gen):
             a list of lists that contain syllables of different words
     """
     syllables = [] #An empty list to store the words that are separated into syllables
-    encoder = Encoder(lang="tr") #Initializing the function for syllable separation in Turkish
+    if self.encoder is None: #Initializing the function for syllable separation in Turkish, once in every process
+      self.encoder = Encoder(lang="tr")
     for word in stems:
       word = word.strip()
-      morphemes = encoder.tokenize(word).split() #Separating the words into their syllables
+      morphemes = self.encoder.tokenize(word).split() #Separating the words into their syllables
       syllables.append(morphemes) #Store the list of syllables of a word in another list
     return syllables
 
@@ -235,16 +2806,35 @@ class Turkish_jabberwocky(Pseudoword_gen):
             a string that contains modified version of argument m2 according to
             the rules of vowel harmony
     """
-    if re.search("[aı]", m1):
-        m2 = re.sub("e|i|o|u|ö|ü","a", m2)
-    elif re.search("[ei]", m1):
-        m2 = re.sub("a|ı|o|u|ö|ü","e", m2)
-    elif re.search("[ou]", m1):
-        m2 = re.sub("e|i|ı|o|ö|ü","a", m2)
-    elif re.search("[öü]", m1):
-        m2 = re.sub("a|i|ı|o|ö|u","e", m2)
+    ranks = m1.translate(VOWEL_RANKS) #the harmony groups of the vowels of m1
+    if ranks:
+      m2 = m2.translate(HARMONY_TABLES[min(ranks)])
     return m2
 
+  def word_classes(self, w):
+    """
+    Finds the harmony class of the last vowel and the class of the final letter
+    of a word in one reverse scan
+
+        Parameters
+        ----------
+        w : str
+            a Turkish word
+
+        Returns
+        -------
+        harmony : str
+            "back" or "front", the words without vowels are "front"
+        final : str
+            "vowel", one of the consonants "p", "ç", "t", "k" that change 
+            before the suffixes, "voiceless" or "voiced"
+    """
+    final = FINAL_CLASS.get(w[-1:], "voiced")
+    for c in reversed(w):
+      if c in HARMONY:
+        return HARMONY[c], final
+    return "front", final
+
   def categorize(self, pwords):
     """
     Takes a list of words and then assigns them into random syntactical 
@@ -268,67 +2858,16 @@ class Turkish_jabberwocky(Pseudoword_gen):
                 "ATTRIBUTE":[],
                 "OBJECT": [],
                 "ADVERBIAL MODIFIER": []} #a dictionary to place words randomly into different syntactical categories
+    collisions = 0
     for w in pwords:
-      c = random.choice(list(categories.keys())) #randomly assigning words to different categories
-      if c == "PREDICATE": #to add appropriate suffixes for predicates (past tense suffix)
-        if re.search("[aeıioöuü]$", w): #following the suffix rules of Turkish
-          if re.search("[aıou]$", w): #following the vowel harmony rules of Turkish
-            w = w + "dı"
-          else:
-            w = w + "di"
-        else:
-          if re.search("[fstkçşhp]$", w):
-            if re.search("[aıou]", w):
-              w = w + "tı"
-            else:
-              w = w + "ti"
-          else:
-            if re.search("[aıou]", w):
-              w = w + "dı"
-            else:
-              w = w + "di"
-      elif c == "OBJECT":
-        if re.search("[aeıioöuü]$", w):
-          if re.search("[aıou]$", w):
-            w = w + "yı"
-          else:
-            w = w + "yi"
-        else:
-          if re.search("p$", w):
-            if re.search("[aıou]", w):
-              w = re.sub("p$", "bı", w)
-            else:
-              w = re.sub("p$", "bi", w)
-          elif re.search("ç$", w):
-            if re.search("[aıou]", w):
-              w = re.sub("ç$", "cı", w)
-            else:
-              w = re.sub("ç$", "ci", w)
-          elif re.search("t$", w):
-            if re.search("[aıou]", w):
-              w = re.sub("t$",  "tı", w)
-            else:
-              w = re.sub("t$",  "ti", w)
-          elif re.search("k$", w):
-            if re.search("[aıou]", w):
-              w = re.sub("k$",  "ğı", w)
-            else:
-              w = re.sub("k$",  "ği", w)
-          else:
-            if re.search("[aıou]", w):
-              w = w + "ı"
-            else:
-              w = w + "i"
-      elif c == "ADVERBIAL MODIFIER":
-        if re.search("[fstkçşhp]$", w):
-          w = w + "ç"
-        else:
-          w = w + "c"
-        if re.search("[aıou]", w):
-          w = w + "a"
-        else:
-          w = w + "e"
+      c = self.rng.choice(list(categories.keys())) #randomly assigning words to different categories
+      cut, suffix = TURKISH_SUFFIXES.get((c,) + self.word_classes(w), (0, "")) #the suffix of the category that follows the rules of vowel harmony and consonant softening
+      w = w[:len(w) - cut] + suffix
+      if suffix and self.lexicon.is_word(w): #the pseudowords are not existing words, but a suffix can still make one
+        collisions += 1
+        continue
       categories[c].append(w)
+    self.metrics.count("categorize", "lexicon_collisions", collisions)
     return categories
   
   def sent_generator(self, pdic):
@@ -349,18 +2888,86 @@ class Turkish_jabberwocky(Pseudoword_gen):
             a Jabberwocky sentence that includes Turkish pseudowords from 
             different syntactical categories in the order of Turkish word order
       """
-      subj = random.choice(list(pdic["SUBJECT"])) #picking random pseudowords from each syntactical category
-      pred = random.choice(list(pdic["PREDICATE"]))
-      attr = random.choice(list(pdic["ATTRIBUTE"]))
-      obje = random.choice(list(pdic["OBJECT"]))
-      adve = random.choice(list(pdic["ADVERBIAL MODIFIER"]))
-      sent_str = random.choice(["sent_str1", "sent_str2"]) #Turkish allows for 2 different word orders, randomly picking one
+      return self.sent_record(pdic)["sentence"] + "\n"
+
+  def sent_record(self, pdic):
+      """
+      Forms a Jabberwocky sentence like sent_generator and returns it with its
+      structure, the same random choices give the same sentence
+
+        Parameters
+        ----------
+        pdic : dict
+            a dictionary that has syntactical categories as the keys and lists
+            of pseudowords that are assigned to that category as values
+
+        Returns
+        -------
+        record : dict
+            the sentence ("sentence"), the name of its word order 
+            ("template") and the slots of the sentence in order ("slots", 
+            dictionaries of the "category" and the "word" of every slot)
+      """
+      for category, words in pdic.items():
+        if not words:
+          raise ValueError("the category %s has no pseudowords, generate more pseudowords" % category)
+      subj = self.rng.choice(list(pdic["SUBJECT"])) #picking random pseudowords from each syntactical category
+      pred = self.rng.choice(list(pdic["PREDICATE"]))
+      attr = self.rng.choice(list(pdic["ATTRIBUTE"]))
+      obje = self.rng.choice(list(pdic["OBJECT"]))
+      adve = self.rng.choice(list(pdic["ADVERBIAL MODIFIER"]))
+      sent_str = self.rng.choice(["sent_str1", "sent_str2"]) #Turkish allows for 2 different word orders, randomly picking one
       if sent_str == "sent_str1":
-        sent = subj + " " + attr + " " + obje + " " + adve + " " + pred + ".\n"
+        slots = [("SUBJECT", subj), ("ATTRIBUTE", attr), ("OBJECT", obje), ("ADVERBIAL MODIFIER", adve), ("PREDICATE", pred)]
       else:
-        sent = subj + " " + adve + " " + attr + " " + obje + " " + pred + ".\n"
-      return sent.capitalize()
+        slots = [("SUBJECT", subj), ("ADVERBIAL MODIFIER", adve), ("ATTRIBUTE", attr), ("OBJECT", obje), ("PREDICATE", pred)]
+      sent = " ".join(word for _, word in slots) + "."
+      return {"sentence": sent.capitalize(),
+              "template": sent_str,
+              "slots": [{"category": category, "word": word} for category, word in slots]}
     
+  def pseudowords(self):
+    """
+    Creates n_words Turkish pseudowords according to the probabilities of 
+    syllables, the syllables are modified according to the rules of vowel 
+    harmony
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        p_words : list
+            a list of unique Turkish pseudowords that are not existing words
+    """
+    plen = 7 #the average word length in Turkish is 7, this value is picked because of that
+    return self.unique_pseudowords(self.n_words, plen, self.harmonize) #the syllables of the pseudowords are picked according to the possibility of syllables following each other
+
+  def harmonize(self, pword):
+    """
+    Modifies the syllables of a pseudostem according to the rules of vowel 
+    harmony and joins them
+
+        Parameters
+        ----------
+        pword : list
+            the syllables of a pseudostem
+
+        Returns
+        -------
+        pword : str or None
+            the pseudoword, None if two vowels appear together in it
+    """
+    m = 1
+    while m < len(pword): #to modify the syllables according to the rules of vowel harmony
+      pword[m] = self.vowel_harmony(pword[m-1], pword[m])
+      m += 1
+    pword = "".join(pword)
+    if VOWEL_PAIR.search(pword): #in Turkish two vowels do not appear together, this condition is to check for this
+      return None
+    return pword
+
   def run(self):
     """
     Runs the functions in the class in an order to create pseudowords and 
@@ -372,41 +2979,10 @@ class Turkish_jabberwocky(Pseudoword_gen):
 
         Returns
         -------
-        None
+        p_sentences : list
+            a list of n_sent Jabberwocky sentences
     """
-    syllable = self.syllabification(self.stems) #To split words into syllables
-    dict_prob, in_morph = self.probabilities(syllable) #To calculate the possibility of syllables following each other
-    p_words = [] #an empty list to store generated pseudowords
-    j = 0 #the number of generated pseudowords
-    while j < self.n_words:
-      pword = [] #an empty list to store the syllables that will be used in generating the pseudoword
-      i = 0 #length of the pseudoword
-      plen = 7 #the average word length in Turkish is 7, this value is picked because of that
-      while i < plen:
-        if pword == []: #initial syllables are picked from the dictionary that stores initial syllables 
-          sound = random.choices(list(in_morph.keys()), weights=in_morph.values())[0]
-          i += len(sound) #increase the length of the word by the picked sound
-        else:
-            if sum(dict_prob[pword[-1]]) != 0: #this condition is necessary, because certain syllables in Turkish only appear in the end of words which means the possibility of these syllables being followed by a syllable is 0 but they are still in the database because they follow a syllable
-              sound = random.choices(list(dict_prob.keys()), weights=dict_prob[pword[-1]])[0]
-              i += len(sound)
-            else:
-              i = plen #if a syllable that usually appears in the end of a word is picked, the word should end not elaborate 
-        pword.append(sound) #add the picked sound to the word
-      m = 1
-      while m < len(pword): #to modify the syllables according to the rules of vowel harmony
-        pword[m] = self.vowel_harmony(pword[m-1], pword[m])
-        m += 1
-      pword = "".join(pword)
-      if not re.search("\w*[aeıioöuü][aeıioöuü]\w*", pword) and pword not in p_words: #in Turkish two vowels do not appear together, this condition is to check for this
-        p_words.append(pword)
-      j += 1
-
-    word_categories = self.categorize(p_words) #to assign random syntactic categories to the pseudowords
-    p_sentences = [] #an empty list to store generated sentences
-    for i in range(self.n_sent):
-      p_sentences.append(self.sent_generator(word_categories))
-    return p_sentences
+    return list(self.iter_sentences(self.n_sent))
 
 class Ukrainian_jabberwocky(Pseudoword_gen):
   """
@@ -423,67 +2999,96 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
         number of the pseudowords to be generated, the default value is 300
     n_sent : int, optional
         number of Jabberwocky sentences to be generated, the default value is 5
+    limit : int, optional
+        number of words from the beginning of the database that are stemmed, 
+        the whole database is used by default
+    cache_dir : str, optional
+        directory where the trained models are stored, the models are not 
+        stored by default
+    workers : int, optional
+        number of processes that stem the database and count the syllables,
+        the default value is 1
+    order : int, optional
+        the order of the syllable model, the default value is 2
+    seed : int, random.Random or numpy.random.Generator, optional
+        the seed of the random generator, a random seed is used by default
+    metrics : Metrics, optional
+        the hook that the stages report their times and events to
 
     Methods
     ---------
     probabilities(syllables):
-        creates a probability dictionary that contains the probabilities of 
+        creates a transition model that contains the probabilities of 
         different syllables following each other, and calculates the probability 
         of different syllables occuring as the first syllable, it requires a 
         list of lists that contains the syllables of words in the language
+    stem_words(words):
+        removes the inflectional suffixes from a list of words and returns the 
+        unique stems
     syllabification(stems):
         takes a list of Ukrainian stems and separates them into their syllables 
-        and stores them in a list of lists
-    normalization(p_list):
-        takes a list of pseudostems and normalizes them to form refined pseudowords
-        by eliminating repeated syllables, redundant vowels, and consonants. 
-        the primary function is to randomly assign suffixes to the pseudostems, 
-        resulting in the creation of morphologically recognizable pseudowords
+        and stores them in flat arrays
+    normalize_word(instance):
+        normalizes a single pseudostem by randomly assigning a suffix to it and
+        eliminating repeated syllables, redundant vowels, and consonants,
+        resulting in a morphologically recognizable pseudoword
     categorize(dataset):
         categorizes a list of words into distinct syntactical categories, 
         adding them to the dictionary
+    pick(dic, category, target=None):
+        picks a random word from the buckets of a category that has an 
+        agreeing word in the target category
     sent_generator(dic):
         takes the dictionary with syntactical categories as keys 
         and words as values to randomly select words from each category 
         and form sentences in Ukrainian word order. gender coordination is 
         taken into account during the selection process
+    sent_record(dic):
+        forms a Jabberwocky sentence like sent_generator and returns it with 
+        its word order, the words of its slots and their agreement features
+    pseudowords():
+        creates Ukrainian pseudostems according to the probabilities of 
+        syllables and normalizes them into pseudowords
     run():
         runs the functions in the class in an order to create pseudowords and 
         Jabberwocky sentences in Ukrainian
   """
-  def __init__(self, filename, n_words, n_sent):
+  language = "ukrainian"
+  stemmer_dist = "uk_stemmer"
+  suffixes = ['о-таки', 'о-то','но','цька','ий','ик','ник','івник','льник','иво','аль','ень','ець','ість','тель','иця','иня','ння','іння','ання','яння','ення','иння','еня','ечок','ечка','ечко','ичок','ичка','енко','енько','исько','ище','івка','овка','ок','ир','ист','изм','ір','іст','ізм','яти','ати','іти'] #the suffixes that are added to the pseudostems
+  endings = frozenset(['б', 'в', 'г', 'ґ', 'д', 'ж', 'з', 'к', 'л', 'м', 'н', 'п', 'р', 'с', 'т', 'ф', 'х', 'ц', 'ч', 'ш', 'щ']) #the pseudostems that end with these consonants get a suffix
+
+  def stem_words(self, words):
     """
-    Constructs all the necessary attributes for the Ukrainian_jabberwocky object, 
-    opens and reads the database that has the existing words and stores them in 
-    a variable. Furthermore, it removes any inflectional suffix from the words
-    and stores the stems in a list.
+    Removes any inflectional suffix from a list of Ukrainian words and returns
+    the unique stems
 
         Parameters
         ----------
-        filename : str
-            name of the database that has the existing words in a language
-        n_words : int
-            number of the pseudowords to be generated, the default value is 300
-        n_sent : int
-            number of Jabberwocky sentences to be generated, the default value 
-            is 5
-    """
-    super().__init__(filename, n_words, n_sent)
+        words : list
+            a list of Ukrainian words
 
-    self.stems = [] #the empty list that will be appended with stems
-    for w in self.words[:50000]: #only taking a portion of the database because the full database contains over 300,000 words, which takes a significant amount of time to run
+        Returns
+        -------
+        stems : list
+            a list of unique Ukrainian stems
+    """
+    if self.stemmer is None: #the stemmer is created once in every process
+      self.stemmer = UkStemmer() 
+    stems = {} #an insertion-ordered set of the stems
+    for w in words: #the lookups are hashed, so the whole database can be stemmed in linear time
       w = re.sub("\w'\w", "", w) #remove apostrophe words
       w = re.sub("\w-\w", "", w) #remove hyphenated words
-      stemmer = UkStemmer() 
-      w = stemmer.stem_word(w) #stem the words from the dataset
-      if w in self.words and len(w) > 1 and w.lower() == w: #two conditions have been included to remove any proper names and one-letter words
-        if w not in self.stems: #avoid appending the same words
-          self.stems.append(w) #append the stems list with unique lower-case two(or more)-syllable stems 
+      w = self.stemmer.stem_word(w) #stem the words from the dataset
+      if self.lexicon.exists(w) and len(w) > 1 and w.lower() == w: #two conditions have been included to remove any proper names and one-letter words
+        stems[w] = None #avoid appending the same words
+    return list(stems) #the list of unique lower-case two(or more)-syllable stems
 
   def syllabification (self, stems):
     """
-      Takes a list of Ukrainian stems and separates them into their syllables and 
-      stores them in a list of lists.
+      Takes a list of Ukrainian stems and separates them into their syllables. 
+      The syllables are stored as IDs in one flat array, together with the 
+      offsets of the stems in it, instead of a list for every stem.
 
           Parameters
           ----------
@@ -492,43 +3097,33 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
 
           Returns
           -------
-          syllables : list
-              a list of lists that contain syllables of different words
+          syllables : ukrsyllab.SyllableBatch
+              the syllable IDs of the stems, the offsets of the stems and the
+              syllable inventory
       """
-    syllables = [] #an empty list to store the words that are separated into syllables
-    for word in stems:
-      morphemes = ukrsyllab.split_word(word) #separating the words into their syllables
-      syllables.append(morphemes) #store the list of syllables of a word in another list
-    return syllables
+    return ukrsyllab.split_batch(stems) #separating the words into their syllables
 
-  def normalization (self, p_list):
+  def normalize_word (self, instance):
     """
-       Takes a list of pseudostems, eliminates repeated syllables, redundant vowels, 
-       and consonants; randomly assigns suffixes to pseudostems, resulting in the 
-       creation of morphologically recognizable pseudowords.
+       Normalizes a single pseudostem: if it ends in a consonant, it gets a random
+       suffix, and the repeated syllables and letters of the result are 
+       collapsed. Every pseudostem is processed only once.
 
           Parameters
           ----------
-          p_list : list
-              a list that contains pseudostems in Ukrainian
+          instance : str
+              a pseudostem in Ukrainian
 
           Returns
           -------
-          p_words : list
-              a list that contains refined morphologically recognizable pseudowords
+          norm : str or None
+              a morphologically recognizable pseudoword, None if the pseudostem
+              does not end in a consonant
       """
-    global p_words
-    p_words = []
-    suffixes = ['о-таки', 'о-то','но','цька','ий','ик','ник','івник','льник','иво','аль','ень','ець','ість','тель','иця','иня','ння','іння','ання','яння','ення','иння','еня','ечок','ечка','ечко','ичок','ичка','енко','енько','исько','ище','івка','овка','ок','ир','ист','изм','ір','іст','ізм','яти','ати','іти']
-    ending = ['б', 'в', 'г', 'ґ', 'д', 'ж', 'з', 'к', 'л', 'м', 'н', 'п', 'р', 'с', 'т', 'ф', 'х', 'ц', 'ч', 'ш', 'щ']
-    for instance in p_list: 
-        if (list(filter(instance.endswith, ending))): #if the ending of the pseudostem matches any ending of the 'ending' list, it gets a random suffix from the 'suffixes' list     
-          norm = instance + random.choice(suffixes)
-          if norm not in p_words: #pseudowords list gets appended with the unique pseudoword
-            p_words.append(norm)
-    p_words = re.sub(r'(.+?)\1+', r'\1', str(p_words))
-    p_words = literal_eval(str(p_words))
-    return p_words  
+    if instance[-1:] not in self.endings: #only the pseudostems that end with a consonant from the 'endings' list get a random suffix from the 'suffixes' list
+      return None
+    norm = instance + self.rng.choice(self.suffixes)
+    return REPEATS.sub(r'\1', norm) #collapse the repeated parts of the word
 
   def categorize (self, dataset): 
     """
@@ -536,7 +3131,9 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
       Initially, subjects and adverbial modifiers are stored in the dictionary, 
       while predicates, attributes, and objects are stored in separate lists 
       for later inflection. Then, the lists are passed to the functions with 
-      the main function. 
+      the main function. Finally, the words of every category are split into
+      buckets by their agreement feature, so that sent_generator can pick the
+      words that agree with each other directly.
 
           Parameters
           ----------
@@ -547,7 +3144,11 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
           -------
           uk_pos : dict
               a dictionary which has syntactical categories as the keys and 
-              pseudowords that are assigned to a syntactical category
+              dictionaries of buckets as values, the buckets are keyed by the 
+              agreement feature: the ending of the predicate that agrees with 
+              a subject (ло, ла, в), the ending of a predicate, the ending of 
+              the attribute that agrees with an object (ої, ого), the ending 
+              of an attribute, or None if there is no agreement
       """
     uk_pos = {"SUBJECT": [],
               "PREDICATE": [],
@@ -555,26 +3156,23 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
               "OBJECT": [],
               "ADVERBIAL MODIFIER": []} #a dictionary to place words into different syntactical categories
     
-    #suffix lists, by which functions within the sentence are implied
-    subj_suff = ['ик','ник','івник','льник','иво','аль','ень','ець','ість','тель','иця','иня','ння','іння','ання','яння','ення','иння','еня','ечок','ечка','ечко','ичок','ичка','енко','исько','ище','івка','овка','ок','ир','ист','изм','ір','іст','ізм']
-    pred_suff = ['ти']
-    attr_suff = ['ий']
-    mod_suff = ['-таки', '-то', 'но', 'ацька' ]
-
     pr = []
     attr = []
-    obj = []
+    obj = [[] for _ in OBJECT_INFLECTIONS] #the subjects of every gender group, to later be inflected -- objects
+    collisions = 0 #the inflected forms that are existing words
 
     for word in dataset: #iterate though the dataset
-        if any(word.endswith(s) for s in subj_suff): #iterate through the suffix list
-              uk_pos["SUBJECT"].append(word) #if there's a match, add pseudowords in the nominative case to the dictionary -- subjects
-              obj.append(word) #if there's a match, add pseudowords in the nominative case to the specific list to later be inflected -- objects 
-        elif any(word.endswith(mod) for mod in mod_suff): 
-              uk_pos["ADVERBIAL MODIFIER"].append(word) #if there's a match, add pseudowords in the nominative case to the dictionary -- adverbial modifiers
-        elif any(word.endswith(p) for p in pred_suff): 
-              pr.append(word) #if there's a match, add pseudowords in the nominative case to the specific list to later be inflected -- predicates
-        elif any(word.endswith(at) for at in attr_suff):
-              attr.append(word) #if there's a match, add pseudowords in the nominative case to the specific list to later be inflected -- attributes
+        category, group = UKRAINIAN_SUFFIXES.classify(word) #the category and the gender group are implied by the suffix
+        if category == "SUBJECT":
+              uk_pos["SUBJECT"].append(word) #add pseudowords in the nominative case to the dictionary -- subjects
+              if group is not None:
+                obj[group].append(word)
+        elif category == "ADVERBIAL MODIFIER": 
+              uk_pos["ADVERBIAL MODIFIER"].append(word) #add pseudowords in the nominative case to the dictionary -- adverbial modifiers
+        elif category == "PREDICATE": 
+              pr.append(word) #add pseudowords in the nominative case to the specific list to later be inflected -- predicates
+        elif category == "ATTRIBUTE":
+              attr.append(word) #add pseudowords in the nominative case to the specific list to later be inflected -- attributes
 
     def infl_dict(infl_suff, inf_suff, lst, dict_key): 
        """
@@ -596,51 +3194,101 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
           -------
           None
       """
+       nonlocal collisions
        for st in lst: #iterate though the list
+          stem = st[:len(st) - len(inf_suff)] #every word of the list ends with the suffix
           for af in infl_suff: #iterate through the nominative suffix list
-            ret = re.sub(inf_suff, af, st) #substitute the ending in the nominative case with the ending in the accusative
-            uk_pos[dict_key].append(ret) 
+            if self.lexicon.is_word(stem + af): #the inflected form must not be an existing word
+              collisions += 1
+              continue
+            uk_pos[dict_key].append(stem + af) #substitute the ending in the nominative case with the ending in the accusative
 
     infl_dict(infl_suff=['в','ла', 'ло'], inf_suff = 'ти', lst=pr, dict_key="PREDICATE")
     infl_dict(infl_suff=['ої','ого'], inf_suff = 'ий', lst=attr, dict_key="ATTRIBUTE")
 
-    def infl_dict_obj (gendered_suffix, inflection): 
-        """
-      Inflects the list of objects for accusative based on gendered noun 
-      inflection rules, which depend on the hardness or softness of the 
-      ending consonant, and adds them to the dictionary.
+    for (gendered_suffix, inflection), objects in zip(OBJECT_INFLECTIONS, obj): #inflect the objects for accusative based on gendered noun inflection rules, which depend on the hardness or softness of the ending consonant
+        for ob in objects:
+          if ob[-1] in ['м', 'р', 'к', 'т']: #nouns ending with these letters get another letter added
+            ob = ob + inflection
+          elif ob[-1] in ['ь', 'я', 'а', 'о', 'е']: #other nouns change the last letter
+            ob = ob[:-1] + inflection
+          if self.lexicon.is_word(ob): #the inflected form must not be an existing word
+            collisions += 1
+            continue
+          uk_pos["OBJECT"].append(ob)
+    self.metrics.count("categorize", "lexicon_collisions", collisions)
+
+    def buckets(words, feature):
+       """
+      Splits the words of a category into buckets by their agreement feature.
 
           Parameters
           ----------
-          gendered_suffix: list
-              a list of gendered inflectional suffixes
-          inflection: str
-              a suffix in infinitive/nominative case to be inflected
+          words : list
+              the words of a category
+          feature : dict
+              a dictionary from the last letters of the words to the agreement
+              feature, the words that end differently have the feature None
           
           Returns
           -------
-          None
+          buckets : dict
+              a dictionary from the agreement features to the lists of words
       """
-        for ob in obj: #iterate though the list
-          if any(ob.endswith(s) for s in gendered_suffix): #iterate through the gendered nominative suffix list
-            if ob[-1] in ['м', 'р', 'к', 'т']: #nouns ending with suffixes from the list, and with these letters specifically, get another letter added
-              ob = ob + inflection
-            elif ob[-1] in ['ь']: #other nouns that match change the last letter 
-              ob = ob[:-1] + inflection
-            elif ob[-1] in ['я']:
-              ob = ob[:-1] + inflection
-            elif ob[-1] in ['а']:
-              ob = ob[:-1] + inflection
-            elif ob[-1] in ['о', 'е']:
-              ob = ob[:-1] + inflection
-            uk_pos["OBJECT"].append(ob)
-
-    infl_dict_obj(gendered_suffix=['ик','ник','івник','льник','ок','ир','ист','изм', 'ір', 'іст', 'ізм'], inflection = 'а') #masculine nouns that end in a hard consonant
-    infl_dict_obj(gendered_suffix= ['аль', 'ень' 'тель', 'ець'], inflection = 'я') #masculine nouns that end in a soft consonant
-    infl_dict_obj(gendered_suffix=['иця','иня','ння','іння','ання','яння','иння'], inflection = 'і') #feminine nouns that end in a soft consonant
-    infl_dict_obj(gendered_suffix=['ичка', 'івка', 'овка'], inflection = 'и') #feminine nouns that end in a hard consonant
-    infl_dict_obj(gendered_suffix=['иво', 'ечко', 'енко', 'исько','ище'], inflection = 'а') #neutral nouns
-    return uk_pos
+       buckets = {}
+       for w in words:
+         for n in (3, 2, 1): #the features are given by the last one, two or three letters
+           if w[-n:] in feature:
+             buckets.setdefault(feature[w[-n:]], []).append(w)
+             break
+         else:
+           buckets.setdefault(None, []).append(w)
+       return buckets
+
+    return {"SUBJECT": buckets(uk_pos["SUBJECT"], SUBJECT_AGREEMENT),
+            "PREDICATE": buckets(uk_pos["PREDICATE"], PREDICATE_FEATURE),
+            "ATTRIBUTE": buckets(uk_pos["ATTRIBUTE"], ATTRIBUTE_FEATURE),
+            "OBJECT": buckets(uk_pos["OBJECT"], OBJECT_AGREEMENT),
+            "ADVERBIAL MODIFIER": buckets(uk_pos["ADVERBIAL MODIFIER"], {})}
+
+  def pick(self, dic, category, target=None):
+    """
+    Picks a random word from the buckets of a category, every word has the 
+    same chance. If the agreeing category is given, only the words that have
+    a non-empty agreeing bucket can be picked.
+
+        Parameters
+        ----------
+        dic : dict
+            the buckets of the categories, as they are returned by categorize
+        category : str
+            the category of the picked word
+        target : str, optional
+            the category that has to agree with the picked word
+
+        Returns
+        -------
+        feature : str or None
+            the agreement feature of the picked word
+        word : str
+            the picked word
+
+        Raises
+        ------
+        ValueError
+            if no word of the category can be picked, when there are too few
+            pseudowords
+    """
+    buckets = dic[category]
+    targets = dic[target] if target is not None else None
+    keys = [k for k, words in buckets.items() if words and (targets is None or k is None or targets.get(k))]
+    if not keys:
+      if not any(buckets.values()):
+        raise ValueError("the category %s has no pseudowords, generate more pseudowords" % category)
+      raise ValueError("no pseudoword of the category %s (agreement features: %s) has an agreeing pseudoword of the category %s, generate more pseudowords"
+                       % (category, ", ".join(sorted(k for k, words in buckets.items() if words and k is not None)), target))
+    k = self.rng.choices(keys, weights=[len(buckets[k]) for k in keys])[0]
+    return k, self.rng.choice(buckets[k])
 
   def sent_generator(self, dic): #generate sentences with the dictionary values, based on the dictionary keys
     """
@@ -652,8 +3300,9 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
           Parameters
           ----------
           dic : dict
-              a dictionary that has syntactical categories as the keys and lists
-              of pseudowords that are assigned to that category as values
+              a dictionary that has syntactical categories as the keys and the
+              buckets of pseudowords that are assigned to that category as 
+              values, as it is returned by categorize
 
           Returns
           -------
@@ -661,38 +3310,77 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
               a Jabberwocky sentence that includes Ukrainian pseudowords from 
               different syntactical categories in Ukrainian word order
     """
-    subj = random.choice(list(dic["SUBJECT"])) #pick a random value
-    pred = random.choice(list(dic["PREDICATE"]))
-    attr = random.choice(list(dic["ATTRIBUTE"]))
-    obje = random.choice(list(dic["OBJECT"]))
-    adve = random.choice(list(dic["ADVERBIAL MODIFIER"]))
-
-    if re.search('[ое]$', subj): #coordinate subject and predicate by gender
-        while not re.search('ло$', pred): #if a chosen subject matches a certain pattern, a predicate must match a specific pattern too -- if it doesn't, a different value is being chosen until the conditions are satisfied.
-          pred = random.choice(list(dic["PREDICATE"]))     
-    elif re.search('[аяь]$', subj):
-        while not re.search('ла$', pred):
-          pred = random.choice(list(dic["PREDICATE"]))
-    elif re.search('[кмстр]$', subj):
-        while not re.search('в$', pred):
-          pred = random.choice(list(dic["PREDICATE"]))
-      
-    if re.search('[иі]$', obje): #coordinate attribute and object by gender
-        while not re.search('ої$', attr): #if a chosen object matches a certain pattern, an attribute must match a specific pattern too -- if it doesn't, a different value is being chosen until the conditions are satisfied.
-          attr = random.choice(list(dic["ATTRIBUTE"]))
-    elif re.search('[ая]$', obje): 
-        while not re.search('ого$', attr):
-          attr = random.choice(list(dic["ATTRIBUTE"]))     
-
-    sent_str = random.choice(["sent_str1", "sent_str2",  "sent_str3"]) #create random sentences using a randomly chosen structure, natural to the ukrainian syntax
+    return self.sent_record(dic)["sentence"] + "\n"
+
+  def sent_record(self, dic):
+    """
+        Forms a Jabberwocky sentence like sent_generator and returns it with 
+        its structure, the same random choices give the same sentence
+
+          Parameters
+          ----------
+          dic : dict
+              a dictionary that has syntactical categories as the keys and the
+              buckets of pseudowords that are assigned to that category as 
+              values, as it is returned by categorize
+
+          Returns
+          -------
+          record : dict
+              the sentence ("sentence"), the name of its word order 
+              ("template") and the slots of the sentence in order ("slots", 
+              dictionaries of the "category", the "word" and the "agreement"
+              of every slot, the agreement is the feature that the subject 
+              and the predicate, or the object and the attribute, share: the 
+              gender ending of the predicate (ло, ла, в) or of the attribute 
+              (ої, ого), None if there is no agreement)
+    """
+    subj_agreement, subj = self.pick(dic, "SUBJECT", "PREDICATE") #pick a random subject that has an agreeing predicate
+    if subj_agreement is None: #coordinate subject and predicate by gender
+      pred = self.pick(dic, "PREDICATE")[1]
+    else: #if a chosen subject matches a certain pattern, a predicate must match a specific pattern too -- it is picked from the bucket of predicates with that pattern
+      pred = self.rng.choice(dic["PREDICATE"][subj_agreement])
+
+    obj_agreement, obje = self.pick(dic, "OBJECT", "ATTRIBUTE") #coordinate attribute and object by gender
+    if obj_agreement is None:
+      attr = self.pick(dic, "ATTRIBUTE")[1]
+    else: #if a chosen object matches a certain pattern, an attribute must match a specific pattern too
+      attr = self.rng.choice(dic["ATTRIBUTE"][obj_agreement])
+    adve = self.pick(dic, "ADVERBIAL MODIFIER")[1]
+
+    subject = ("SUBJECT", subj, subj_agreement)
+    predicate = ("PREDICATE", pred, subj_agreement)
+    attribute = ("ATTRIBUTE", attr, obj_agreement)
+    obj = ("OBJECT", obje, obj_agreement)
+    adverbial = ("ADVERBIAL MODIFIER", adve, None)
+    sent_str = self.rng.choice(["sent_str1", "sent_str2",  "sent_str3"]) #create random sentences using a randomly chosen structure, natural to the ukrainian syntax
     if sent_str == "sent_str1":
-      sent = subj + " " + pred + " " + attr + " " + obje + " " + adve + ".\n"
+      slots = [subject, predicate, attribute, obj, adverbial]
     elif sent_str == "sent_str2":
-      sent = adve + " " + subj + " " + pred + " " + attr + " " + obje + ".\n"
+      slots = [adverbial, subject, predicate, attribute, obj]
     else: 
-      sent = attr + " " + obje + " " + pred + " " + subj + " " + adve + ".\n"
-    sent = sent.capitalize()
-    return sent
+      slots = [attribute, obj, predicate, subject, adverbial]
+    sent = " ".join(word for _, word, _ in slots) + "."
+    return {"sentence": sent.capitalize(),
+            "template": sent_str,
+            "slots": [{"category": category, "word": word, "agreement": agreement} for category, word, agreement in slots]}
+
+  def pseudowords(self):
+      """
+      Creates Ukrainian pseudostems according to the probabilities of syllables
+      and normalizes them into n_words pseudowords
+
+          Parameters
+          ----------
+          None
+
+          Returns
+          -------
+          p_words : list
+              a list of unique Ukrainian pseudowords that are not existing words
+      """  
+      plen = 5
+      return self.unique_pseudowords(self.n_words, plen, lambda pword: self.normalize_word("".join(pword))) #normalize every new pseudostem only once
 
   def run(self):
       """
@@ -705,45 +3393,178 @@ class Ukrainian_jabberwocky(Pseudoword_gen):
 
           Returns
           -------
-          None
+          p_sentences : list
+              a list of n_sent Jabberwocky sentences
       """  
-      syllable = self.syllabification(self.stems)
-      dict_prob, in_morph = self.probabilities(syllable)
-      
-      pre_p_words = [] 
-      j=0
-      while j < self.n_words: #create pseudostems
-        pword = []
-        i = 0
-        plen = 5
-        while i < plen:
-         if pword == []:
-           sound = random.choices(list(in_morph.keys()), weights=in_morph.values())[0]
-           i += len(sound)
-         else:
-            if sum(dict_prob[pword[-1]]) != 0:
-              sound = random.choices(list(dict_prob.keys()), weights=dict_prob[pword[-1]])[0]
-              i += len(sound)
-            else:
-              i = plen
-         pword.append(sound)
-        pword = "".join(pword)
-        pre_p_words.append(pword)
-        p_words = self.normalization(pre_p_words) #run function to normalize the stems
-        j += 1
-
-      word_categories = self.categorize(p_words)#run function to sort the parts of the sentences into the dictionary
-      p_sentences = []
-      for i in range(self.n_sent):
-        p_sentences.append(self.sent_generator(word_categories)) #run function to create sentences
-      return p_sentences
+      return list(self.iter_sentences(self.n_sent))
   
-#The code for getting inputs from the user
-lang = input("Enter the language of the Jabberwocky sentences ('Turkish' or 'Ukrainian')(To quit enter 'q'): ") #Getting the language input from the user
+CATEGORIES = ["SUBJECT", "PREDICATE", "ATTRIBUTE", "OBJECT", "ADVERBIAL MODIFIER"] #the slots of the sentences in both languages
+RECORD_COLUMNS = (["sentence", "template", "word_order"]
+                  + [c.lower().replace(" ", "_") for c in CATEGORIES]
+                  + [c.lower().replace(" ", "_") + "_agreement" for c in CATEGORIES]) #the columns of the CSV and Parquet outputs
+FORMATS = ["txt", "jsonl", "csv", "parquet"]
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"} #the compressions of the output and the extensions of their files
+
+def record_row(record):
+  """
+  Flattens the record of a sentence into a row of RECORD_COLUMNS, a word and
+  an agreement feature for every category
+
+      Parameters
+      ----------
+      record : dict
+          the record of a sentence, as it is returned by sent_record, or a 
+          dictionary with only the sentence
+
+      Returns
+      -------
+      row : dict
+          the values of the columns, the missing ones are None
+  """
+  row = dict.fromkeys(RECORD_COLUMNS)
+  row["sentence"] = record["sentence"]
+  row["template"] = record.get("template")
+  slots = record.get("slots")
+  if slots:
+    row["word_order"] = " ".join(slot["category"].lower().replace(" ", "_") for slot in slots)
+    for slot in slots:
+      column = slot["category"].lower().replace(" ", "_")
+      row[column] = slot["word"]
+      row[column + "_agreement"] = slot.get("agreement")
+  return row
+
+def open_output(f_name, compression=None):
+  """
+  Opens an output text file with a large buffer, compressed with gzip or zstd
+  if it is asked for
+
+      Parameters
+      ----------
+      f_name : str
+          name of the output file
+      compression : str, optional
+          "gzip" or "zstd", the file is not compressed by default. zstd needs 
+          the zstandard package
+
+      Returns
+      -------
+      f : file object
+          a text file object, the lines are not translated
+  """
+  if compression == "gzip":
+    return gzip.open(f_name, "wt", encoding="utf-8", newline="")
+  if compression == "zstd":
+    if zstandard is None:
+      raise ValueError("the zstd compression needs the zstandard package")
+    return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(f_name, "wb")), encoding="utf-8", newline="", write_through=True)
+  return open(f_name, "w", encoding="utf-8", newline="", buffering=1 << 20)
+
+def write_sentences(f_name, sentences, chunk_size=10000, fmt="txt", compression=None):
+  """
+  Writes the sentences into a file in chunks, the sentences can come from a 
+  generator so that only one chunk is stored in memory at a time
+
+      Parameters
+      ----------
+      f_name : str
+          name of the output file
+      sentences : iterable
+          the Jabberwocky sentences, or their records as they are returned by
+          sent_record
+      chunk_size : int, optional
+          number of sentences that are written at once, the default value is 
+          10000
+      fmt : str, optional
+          "txt" for a sentence in every line, "jsonl" for the record of a 
+          sentence in every line, "csv" for a row of RECORD_COLUMNS for every
+          sentence, "parquet" for the same columns in a Parquet file (it 
+          needs the pyarrow package), the default value is "txt"
+      compression : str, optional
+          "gzip" or "zstd", the file is not compressed by default. A Parquet 
+          file is compressed inside, by its column chunks
+
+      Returns
+      -------
+      n : int
+          number of the written sentences
+  """
+  sentences = iter(sentences)
+  chunks = iter(lambda: list(itertools.islice(sentences, chunk_size)), [])
+  if fmt == "parquet":
+    return write_parquet(f_name, chunks, compression)
+  n = 0
+  with open_output(f_name, compression) as f:
+    writer = csv.DictWriter(f, RECORD_COLUMNS) if fmt == "csv" else None
+    if writer is not None:
+      writer.writeheader()
+    for chunk in chunks:
+      if fmt != "txt": #the plain sentences are turned into records with only the sentence
+        chunk = [sent if isinstance(sent, dict) else {"sentence": sent.strip()} for sent in chunk]
+      if fmt == "jsonl":
+        f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk))
+      elif fmt == "csv":
+        writer.writerows(record_row(record) for record in chunk)
+      else:
+        f.write("".join(sent["sentence"] + "\n" if isinstance(sent, dict) else sent for sent in chunk))
+      n += len(chunk)
+  return n
+
+def write_parquet(f_name, chunks, compression=None):
+  """
+  Writes the records of the sentences into a Parquet file, every chunk is a 
+  row group of RECORD_COLUMNS
+
+      Parameters
+      ----------
+      f_name : str
+          name of the output file
+      chunks : iterable
+          lists of the records of the sentences
+      compression : str, optional
+          "gzip" or "zstd", the column chunks are not compressed by default
+
+      Returns
+      -------
+      n : int
+          number of the written sentences
+  """
+  if pyarrow is None:
+    raise ValueError("the Parquet output needs the pyarrow package")
+  schema = pyarrow.schema([(column, pyarrow.string()) for column in RECORD_COLUMNS])
+  n = 0
+  with pyarrow.parquet.ParquetWriter(f_name, schema, compression=compression or "none") as writer:
+    for chunk in chunks:
+      rows = [record_row(sent if isinstance(sent, dict) else {"sentence": sent.strip()}) for sent in chunk]
+      writer.write_table(pyarrow.Table.from_pylist(rows, schema=schema))
+      n += len(rows)
+  return n
+
+LANGUAGES = {"turkish": (Turkish_jabberwocky, "tr_TR.csv"),
+             "ukrainian": (Ukrainian_jabberwocky, "uk_UA.csv")} #the classes and the default databases of the languages
+
+def ask_inputs(extension="txt"):
+    """
+    Asks the user for the language, the number of pseudowords, the number of 
+    sentences and the name of the output file from the Python console
+
+        Parameters
+        ----------
+        extension : str, optional
+            the extension that is added to the name of the output file, the
+            default value is "txt"
 
-if lang.lower() != "q":
+        Returns
+        -------
+        inputs : tuple or None
+            the language, the number of pseudowords, the number of sentences 
+            and the name of the output file, None if the user wants to quit
+    """
+    lang = input("Enter the language of the Jabberwocky sentences ('Turkish' or 'Ukrainian')(To quit enter 'q'): ") #Getting the language input from the user
+
+    if lang.lower() == "q":
+        return None
 
-    while lang.lower() not in ["turkish", "ukrainian"]: #If a language that does not exist in the program is entered
+    while lang.lower() not in LANGUAGES: #If a language that does not exist in the program is entered
         print("You have entered a language that is not currently in the programme. Plase try again!")
         lang = input("Enter the language of the Jabberwocky sentences ('Turkish' or 'Ukrainian): ")
 
@@ -752,7 +3573,7 @@ if lang.lower() != "q":
         try:
             n_words = int(n_words) #If an integer value is entered by the user
             break
-        except: #If a non-integer value is entered by the user
+        except ValueError: #If a non-integer value is entered by the user
             print("The value that you have entered is not an integer. Please enter another number!")
             n_words = input("Enter the number of pseudowords to be generated (The default value is 300) (The value entered should be an integer): ") or "300"
         
@@ -761,19 +3582,160 @@ if lang.lower() != "q":
         try:
             n_sent = int(n_sent) #If an integer value is entered by the user
             break
-        except: #If a non-integer value is entered by the user
+        except ValueError: #If a non-integer value is entered by the user
             print("The value that you have entered is not an integer. Please enter another number!")
             n_sent = input("Enter the number of pseudowords to be generated (The default value is 5) (The value entered should be an integer): ") or "5"
         
-    f_name = input("Enter a name for the output file (It will be saved as [filename].txt): ") + ".txt" #filename for the output file
-    
-    if lang.lower() == "ukrainian": #If Ukrainian is selected 
-        j_sent = Ukrainian_jabberwocky("uk_UA.csv", n_words, n_sent).run()
-    elif lang.lower() == "turkish": #If Turkish is selected
-        j_sent = Turkish_jabberwocky("tr_TR.csv", n_words, n_sent).run()
-    
-    f = open(f_name, "w", encoding="utf-8")
-    for s in j_sent:
-        f.write(s)
+    f_name = input("Enter a name for the output file (It will be saved as [filename].%s): " % extension) + "." + extension #filename for the output file
+    return lang.lower(), n_words, n_sent, f_name
+
+def non_negative(value):
+    """
+    Converts the --words and --sentences arguments, which cannot be negative
+
+        Parameters
+        ----------
+        value : str
+            the argument
+
+        Returns
+        -------
+        number : int
+            the number of the pseudowords or the sentences
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not an integer" % value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("the number cannot be negative")
+    return number
+
+def process_count(value):
+    """
+    Converts the --workers argument, at least one process is needed
+
+        Parameters
+        ----------
+        value : str
+            the argument
+
+        Returns
+        -------
+        workers : int
+            the number of the processes
+    """
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not an integer" % value)
+    if workers < 1:
+        raise argparse.ArgumentTypeError("at least one process is needed")
+    return workers
+
+def model_order(value):
+    """
+    Converts the --order argument, the order of a model must be at least 2 
+
+        Parameters
+        ----------
+        value : str
+            the argument
+
+        Returns
+        -------
+        order : int
+            the order of the model
+    """
+    try:
+        order = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not an integer" % value)
+    if not 2 <= order <= Transition_model.max_order:
+        raise argparse.ArgumentTypeError("the order must be between 2 and %d" % Transition_model.max_order)
+    return order
+
+def parse_args(argv=None):
+    """
+    Parses the command line arguments
+
+        Parameters
+        ----------
+        argv : list, optional
+            the arguments, sys.argv is used by default
+
+        Returns
+        -------
+        args : argparse.Namespace
+            the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Generates pseudowords and Jabberwocky sentences in Turkish or Ukrainian. "
+                                                 "If no language is given, the inputs are asked from the console, "
+                                                 "which needs an interactive terminal.")
+    parser.add_argument("-l", "--language", type=str.lower, choices=sorted(LANGUAGES), help="language of the Jabberwocky sentences")
+    parser.add_argument("-c", "--corpus", help="database of the existing words (uk_UA.csv or tr_TR.csv by default)")
+    parser.add_argument("-w", "--words", type=non_negative, default=300, help="number of the pseudowords to be generated (default: 300)")
+    parser.add_argument("-n", "--sentences", type=non_negative, default=5, help="number of the sentences to be generated (default: 5)")
+    parser.add_argument("-s", "--seed", type=int, help="seed of the random generator, for reproducible output")
+    parser.add_argument("-o", "--output", help="name of the output file ([language]_Jabberwockysent.[format] by default)")
+    parser.add_argument("-j", "--workers", type=process_count, default=1, help="number of processes for stemming, counting and generating the sentences (default: 1)")
+    parser.add_argument("--unordered", action="store_true", help="write the shards of sentences as soon as the workers finish them, not in order")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="txt", help="format of the output file, jsonl, csv and parquet also record the slots, the categories and the word order of every sentence (default: txt)")
+    parser.add_argument("--compress", choices=sorted(COMPRESSIONS), help="compress the output file with gzip or zstd (zstd needs the zstandard package)")
+    parser.add_argument("--order", type=model_order, default=2, help="order of the syllable model, 2 for syllable pairs, 3 for triples... (default: 2)")
+    parser.add_argument("--limit", type=int, help="number of words from the beginning of the database to stem (default: all)")
+    parser.add_argument("--cache-dir", help="directory to store the trained models in and load them from")
+    parser.add_argument("--metrics", help="file to write the time and the events of every stage to, in the Prometheus text format if it ends with .prom, as JSON otherwise")
+    args = parser.parse_args(argv)
+    if args.language is None and not sys.stdin.isatty(): #no console to ask the inputs from, e.g. under a job scheduler
+        parser.error("--language is required when not run interactively")
+    if args.format == "parquet" and pyarrow is None: #the missing packages are reported before the training
+        parser.error("the Parquet output needs the pyarrow package")
+    if args.compress == "zstd" and args.format != "parquet" and zstandard is None: #a Parquet file is compressed by pyarrow itself
+        parser.error("the zstd compression needs the zstandard package")
+    return args
+
+def main(argv=None):
+    """
+    Generates Jabberwocky sentences according to the command line arguments, or
+    according to the inputs from the console if no language is given
+
+        Parameters
+        ----------
+        argv : list, optional
+            the arguments, sys.argv is used by default
+
+        Returns
+        -------
+        status : int
+            the exit status
+    """
+    args = parse_args(argv)
+    extension = args.format
+    if args.compress and args.format != "parquet": #a Parquet file is compressed inside
+        extension += COMPRESSIONS[args.compress]
+    if args.language is None:
+        inputs = ask_inputs(extension)
+        if inputs is None: #the user wants to quit
+            return 0
+        args.language, args.words, args.sentences, args.output = inputs
+
+    cls, corpus = LANGUAGES[args.language]
+    f_name = args.output or "%s_Jabberwockysent.%s" % (args.language, extension)
+    metrics = Metrics_recorder() if args.metrics else None
+    generator = cls(args.corpus or corpus, args.words, args.sentences, limit=args.limit, cache_dir=args.cache_dir, workers=args.workers, order=args.order, seed=args.seed, metrics=metrics)
+    sentences = generator.iter_sentences(args.sentences, ordered=not args.unordered, records=args.format != "txt")
+    try:
+        write_sentences(f_name, sentences, fmt=args.format, compression=args.compress) #the sentences are written while they are generated
+    except ValueError as error: #e.g. too few pseudowords for every category
+        print("The sentences could not be generated: %s" % error)
+        return 1
+    if metrics is not None:
+        metrics.write(args.metrics)
+    if generator.acceptance_rate is not None:
+        print("%.1f%% of the pseudostems became pseudowords." % (100 * generator.acceptance_rate))
     print('Done.')
-    f.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
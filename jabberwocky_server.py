@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+"""Jabberwocky generation server.
+
+Trains one model for every language at startup and keeps it in memory, then
+serves pseudowords and Jabberwocky sentences over HTTP with JSON responses:
+
+    GET /pseudowords?language=ukrainian&n=100&seed=7
+    GET /sentences?language=turkish&n=10
+    GET /health
+
+The parameters can also be sent as a JSON object in the body of a POST
+request. The large batches are generated by a pool of worker processes, so the
+event loop stays responsive.
+
+    python3 jabberwocky_server.py --language ukrainian --port 8080 --cache-dir models
+"""
+import argparse, asyncio, json, multiprocessing, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qsl
+
+import jabberwocky_sentence_generator as jsg
+
+class Request_error(Exception):
+  """
+  An error in a request, it is answered with its HTTP status and message
+  """
+  def __init__(self, status, message):
+    super().__init__(message)
+    self.status = status
+
+class Warm_model():
+  """
+  A trained generator of a language together with the syntactical categories
+  of its pseudowords, ready to generate new pseudowords and sentences.
+    ...
+
+    Attributes
+    ----------
+    generator : Pseudoword_gen
+        the trained generator
+    categories : dict
+        the pseudowords of the syntactical categories, as they are returned by
+        categorize
+
+    Methods
+    -------
+    pseudowords(n, seed):
+        creates n unique pseudowords
+    sentences(n, seed):
+        creates n Jabberwocky sentences
+  """
+  def __init__(self, generator):
+    """
+    Trains the generator and assigns its pseudowords to the categories
+
+        Parameters
+        ----------
+        generator : Pseudoword_gen
+            a Turkish_jabberwocky or Ukrainian_jabberwocky object
+    """
+    self.generator = generator
+    generator.train()
+    self.categories = generator.categorize(generator.pseudowords())
+
+  def pseudowords(self, n, seed):
+    """
+    Creates n unique pseudowords
+
+        Parameters
+        ----------
+        n : int
+            number of pseudowords
+        seed : int
+            the seed of the random stream
+
+        Returns
+        -------
+        p_words : list
+            a list of unique pseudowords
+    """
+    return self.generator.pseudoword_shard(n, seed)
+
+  def sentences(self, n, seed):
+    """
+    Creates n Jabberwocky sentences from the pseudowords of the categories
+
+        Parameters
+        ----------
+        n : int
+            number of sentences
+        seed : int
+            the seed of the random stream
+
+        Returns
+        -------
+        sentences : list
+            a list of sentences without the line endings
+    """
+    return [sent.rstrip("\n") for sent in self.generator.sentence_shard(self.categories, seed, n)]
+
+_models = None #the models of a worker process, set by _init_worker
+
+def _init_worker(models):
+  """
+  Stores the models in a worker process
+  """
+  global _models
+  _models = models
+
+def _generate(kind, language, n, seed):
+  """
+  Generates a batch of pseudowords or sentences in a worker process
+  """
+  return getattr(_models[language], kind)(n, seed)
+
+STATUS = {200: b"OK", 400: b"Bad Request", 404: b"Not Found", 405: b"Method Not Allowed", 413: b"Payload Too Large", 500: b"Internal Server Error"} #the reasons of the HTTP statuses
+
+class Jabberwocky_server():
+  """
+  An asyncio HTTP server that keeps a trained model for every language in
+  memory. The batches that are larger than inline_limit are generated by the
+  worker processes, the smaller ones directly in the event loop, where they
+  take less time than sending them to a worker.
+    ...
+
+    Attributes
+    ----------
+    models : dict
+        a Warm_model for every language
+    workers : int
+        number of worker processes, at least one is started
+    max_n : int
+        the largest batch that can be requested
+    inline_limit : int
+        the largest batch that is generated in the event loop
+    max_body : int
+        the largest body of a request in bytes
+    rng : random.Random
+        the generator of the seeds of the requests that do not give a seed
+    pool : ProcessPoolExecutor or None
+        the worker processes
+
+    Methods
+    -------
+    start():
+        starts the worker processes
+    close():
+        stops the worker processes
+    restart(broken):
+        replaces a pool whose worker process died
+    generate(kind, language, n, seed):
+        generates a batch of pseudowords or sentences
+    dispatch(method, target, body):
+        answers a request
+    handle(reader, writer):
+        reads the requests of a connection and writes the responses
+    serve(host, port, path):
+        serves the requests until it is cancelled
+  """
+  inline_limit = 200 #number of items that are generated in the event loop without a worker
+  max_body = 65536 #the largest body of a request in bytes, the parameters are much smaller
+
+  def __init__(self, models, workers=1, max_n=100000, seed=None):
+    """
+    Constructs the server
+
+        Parameters
+        ----------
+        models : dict
+            a Warm_model for every language
+        workers : int, optional
+            number of worker processes, the default value is 1, at least one
+            is started so that the large batches never block the event loop
+        max_n : int, optional
+            the largest batch that can be requested, the default value is
+            100000
+        seed : int, optional
+            the seed of the seeds of the requests that do not give a seed
+    """
+    self.models = models
+    self.workers = workers
+    self.max_n = max_n
+    self.rng = jsg.make_rng(seed)
+    self.pool = None
+
+  def start(self):
+    """
+    Starts the worker processes. They are forked where it is possible, so the
+    trained models are shared with them copy-on-write
+    """
+    if self.pool is None:
+      workers = max(1, self.workers) #a single worker still keeps the large batches out of the event loop
+      context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+      self.pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(self.models,))
+      for future in [self.pool.submit(int) for _ in range(workers)]: #the processes are started now, before any connection is open, not by the first large request
+        future.result()
+
+  def close(self):
+    """
+    Stops the worker processes
+    """
+    if self.pool is not None:
+      self.pool.shutdown()
+      self.pool = None
+
+  def restart(self, broken):
+    """
+    Replaces a pool whose worker process died with a new one, unless another
+    request has replaced it already
+
+        Parameters
+        ----------
+        broken : ProcessPoolExecutor
+            the broken pool
+    """
+    if self.pool is broken:
+      broken.shutdown(wait=False)
+      self.pool = None
+      self.start()
+
+  async def generate(self, kind, language, n, seed):
+    """
+    Generates a batch of pseudowords or sentences, in a worker process if the
+    batch is large. If a worker process dies, the pool is replaced and the
+    batch is tried once more
+
+        Parameters
+        ----------
+        kind : str
+            "pseudowords" or "sentences"
+        language : str
+            the language of the batch
+        n : int
+            number of items
+        seed : int
+            the seed of the random stream of the batch
+
+        Returns
+        -------
+        items : list
+            the pseudowords or sentences
+    """
+    if self.pool is None or n <= self.inline_limit:
+      return getattr(self.models[language], kind)(n, seed)
+    for attempt in range(2):
+      pool = self.pool
+      try:
+        return await asyncio.get_running_loop().run_in_executor(pool, _generate, kind, language, n, seed)
+      except BrokenProcessPool:
+        self.restart(pool) #the later large batches get a working pool
+        if attempt:
+          raise
+
+  def parameters(self, query):
+    """
+    Checks the parameters of a generation request
+
+        Parameters
+        ----------
+        query : dict
+            the parameters of the request
+
+        Returns
+        -------
+        language : str
+            the language
+        n : int
+            number of items
+        seed : int
+            the seed of the batch, drawn from the generator of the server if it
+            is not given
+    """
+    language = str(query.get("language", next(iter(self.models)) if len(self.models) == 1 else "")).lower()
+    if language not in self.models:
+      raise Request_error(400, "language must be one of: %s" % ", ".join(sorted(self.models)))
+    try:
+      n = int(query.get("n", 1))
+      seed = int(query["seed"]) if query.get("seed") is not None else self.rng.getrandbits(64)
+    except (TypeError, ValueError):
+      raise Request_error(400, "n and seed must be integers")
+    if not 0 < n <= self.max_n:
+      raise Request_error(400, "n must be between 1 and %d" % self.max_n)
+    return language, n, seed
+
+  async def dispatch(self, method, target, body=b""):
+    """
+    Answers a request
+
+        Parameters
+        ----------
+        method : str
+            the HTTP method
+        target : str
+            the path and the query string
+        body : bytes, optional
+            the body of a POST request, a JSON object of parameters
+
+        Returns
+        -------
+        status : int
+            the HTTP status
+        response : dict
+            the JSON response
+    """
+    url = urlsplit(target)
+    query = dict(parse_qsl(url.query))
+    try:
+      if method == "POST" and body:
+        try:
+          query.update(json.loads(body))
+        except (ValueError, TypeError):
+          raise Request_error(400, "the body must be a JSON object")
+      if url.path == "/health":
+        return 200, {"status": "ok", "languages": sorted(self.models)}
+      if url.path not in ("/pseudowords", "/sentences"):
+        raise Request_error(404, "unknown path %s" % url.path)
+      if method not in ("GET", "POST"):
+        raise Request_error(405, "method %s is not allowed" % method)
+      kind = url.path[1:]
+      language, n, seed = self.parameters(query)
+      try:
+        items = await self.generate(kind, language, n, seed)
+      except Exception as error: #e.g. a category of the model has no words, the connection still gets an answer
+        raise Request_error(500, "the generation failed: %s: %s" % (type(error).__name__, error))
+      return 200, {"language": language, "seed": seed, kind: items}
+    except Request_error as error:
+      return error.status, {"error": str(error)}
+
+  async def handle(self, reader, writer):
+    """
+    Reads the HTTP requests of a connection and writes the responses, the
+    connection is kept open until the client closes it or asks to close it
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            the stream of the requests
+        writer : asyncio.StreamWriter
+            the stream of the responses
+
+        Returns
+        -------
+        None
+    """
+    try:
+      while True:
+        line = await reader.readline()
+        if not line.strip():
+          break
+        try:
+          method, target, version = line.decode("latin-1").split()
+        except ValueError:
+          method, target, version = "", "", ""
+        headers = {}
+        while True:
+          header = await reader.readline()
+          if header in (b"\r\n", b"\n", b""):
+            break
+          name, _, value = header.decode("latin-1").partition(":")
+          headers[name.strip().lower()] = value.strip()
+        close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+        try:
+          length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+          length = -1
+        if not 0 <= length <= self.max_body: #the body is not read, so the connection cannot be reused
+          status, response = (413, {"error": "the body is larger than %d bytes" % self.max_body}) if length > 0 else (400, {"error": "malformed Content-Length"})
+          close = True
+        else:
+          body = await reader.readexactly(length)
+          if method:
+            status, response = await self.dispatch(method.upper(), target, body)
+          else:
+            status, response = 400, {"error": "malformed request line"}
+        data = json.dumps(response, ensure_ascii=False).encode("utf8")
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: %d\r\n%s\r\n"
+                     % (status, STATUS[status], len(data), b"Connection: close\r\n" if close else b""))
+        writer.write(data)
+        await writer.drain()
+        if close:
+          break
+    except (asyncio.IncompleteReadError, ConnectionError):
+      pass
+    finally:
+      writer.close()
+
+  async def serve(self, host="127.0.0.1", port=8080, path=None):
+    """
+    Starts the worker processes and serves the requests until it is
+    cancelled
+
+        Parameters
+        ----------
+        host : str, optional
+            the address to listen on, the default value is "127.0.0.1"
+        port : int, optional
+            the port to listen on, the default value is 8080
+        path : str, optional
+            a Unix socket to listen on instead of the address
+
+        Returns
+        -------
+        None
+    """
+    self.start()
+    try:
+      if path:
+        server = await asyncio.start_unix_server(self.handle, path)
+      else:
+        server = await asyncio.start_server(self.handle, host, port)
+      async with server:
+        await server.serve_forever()
+    finally:
+      self.close()
+
+class Client():
+  """
+  A small HTTP client of the server, for the scripts and the tests that run in
+  the same process as the server. Every request opens a new connection.
+    ...
+
+    Attributes
+    ----------
+    host : str
+        the address of the server
+    port : int
+        the port of the server
+    path : str or None
+        the Unix socket of the server
+
+    Methods
+    -------
+    request(endpoint, **params):
+        sends a request and returns the status and the JSON response
+    pseudowords(language, n, seed=None):
+        requests pseudowords
+    sentences(language, n, seed=None):
+        requests sentences
+  """
+  def __init__(self, host="127.0.0.1", port=8080, path=None):
+    self.host = host
+    self.port = port
+    self.path = path
+
+  async def request(self, endpoint, **params):
+    """
+    Sends a POST request with the parameters as a JSON body
+
+        Parameters
+        ----------
+        endpoint : str
+            the path of the request, e.g. "/sentences"
+        params : dict
+            the parameters of the request
+
+        Returns
+        -------
+        status : int
+            the HTTP status
+        response : dict
+            the JSON response
+    """
+    if self.path:
+      reader, writer = await asyncio.open_unix_connection(self.path)
+    else:
+      reader, writer = await asyncio.open_connection(self.host, self.port)
+    try:
+      body = json.dumps(params).encode("utf8")
+      writer.write(b"POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n"
+                   % (endpoint.encode("latin-1"), self.host.encode("latin-1"), len(body)) + body)
+      await writer.drain()
+      status = int((await reader.readline()).split()[1])
+      length = 0
+      while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b""):
+          break
+        name, _, value = header.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+          length = int(value)
+      return status, json.loads(await reader.readexactly(length))
+    finally:
+      writer.close()
+
+  async def pseudowords(self, language, n, seed=None):
+    status, response = await self.request("/pseudowords", language=language, n=n, seed=seed)
+    if status != 200:
+      raise Request_error(status, response.get("error"))
+    return response["pseudowords"]
+
+  async def sentences(self, language, n, seed=None):
+    status, response = await self.request("/sentences", language=language, n=n, seed=seed)
+    if status != 200:
+      raise Request_error(status, response.get("error"))
+    return response["sentences"]
+
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(description="Serves pseudowords and Jabberwocky sentences from models that are trained once at startup.")
+  parser.add_argument("-l", "--language", action="append", type=str.lower, choices=sorted(jsg.LANGUAGES), help="a language to serve, can be given more than once (default: every language whose database exists)")
+  parser.add_argument("-c", "--corpus", action="append", default=[], metavar="LANGUAGE=FILE", help="database of a language (uk_UA.csv and tr_TR.csv by default)")
+  parser.add_argument("-w", "--words", type=jsg.non_negative, default=20000, help="number of pseudowords that the sentences are built from (default: 20000)")
+  parser.add_argument("-j", "--workers", type=jsg.process_count, default=1, help="number of processes for training and for the large batches (default: 1)")
+  parser.add_argument("-s", "--seed", type=int, help="seed of the models and of the seeds of the requests that do not give one")
+  parser.add_argument("--order", type=jsg.model_order, default=2, help="order of the syllable model (default: 2)")
+  parser.add_argument("--limit", type=int, help="number of words from the beginning of the database to stem (default: all)")
+  parser.add_argument("--cache-dir", help="directory to store the trained models in and load them from")
+  parser.add_argument("--max-n", type=int, default=100000, help="largest batch that can be requested (default: 100000)")
+  parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+  parser.add_argument("-p", "--port", type=int, default=8080, help="port to listen on (default: 8080)")
+  parser.add_argument("--unix", help="Unix socket to listen on instead of the address")
+  return parser.parse_args(argv)
+
+def main(argv=None):
+  args = parse_args(argv)
+  corpora = dict(c.split("=", 1) for c in args.corpus)
+  languages = args.language
+  if not languages: #only the languages whose database exists are served by default
+    languages = []
+    for language in sorted(jsg.LANGUAGES):
+      corpus = corpora.get(language, jsg.LANGUAGES[language][1])
+      if os.path.exists(corpus):
+        languages.append(language)
+      else:
+        print("%s is skipped, its database %s does not exist" % (language, corpus), file=sys.stderr)
+    if not languages:
+      print("No database was found, give one with --corpus LANGUAGE=FILE", file=sys.stderr)
+      return 1
+  models = {}
+  for language in languages:
+    cls, corpus = jsg.LANGUAGES[language]
+    generator = cls(corpora.get(language, corpus), args.words, 0, limit=args.limit, cache_dir=args.cache_dir,
+                    workers=args.workers, order=args.order, seed=args.seed)
+    models[language] = Warm_model(generator)
+    print("%s model is ready" % language, file=sys.stderr)
+  server = Jabberwocky_server(models, workers=args.workers, max_n=args.max_n, seed=args.seed)
+  try:
+    asyncio.run(server.serve(args.host, args.port, args.unix))
+  except KeyboardInterrupt:
+    pass
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -2,6 +2,10 @@
 
 # https://github.com/Koziev/rusyllab -- slightly changed for ukrainian 
 
+import collections
+import functools
+from array import array
+
 
 def V(c):
     return c in u"ААЕИІОУЯЮЄЇаеиіоуяюєї"
@@ -27,553 +31,257 @@ def END(c):
     return c == u"]"
 
 
+# The SYLLABER rules in the order in which they are tried. A rule is a pattern
+# of character classes that must match at the current position (V - vowel,
+# C - consonant, S - й, M - ь, [ and ] - the word boundaries, X - any other
+# character, !K - any class except K) and the lengths of the syllables that
+# the rule closes. The first rule that matches wins.
+SYLLABER = [
+    ("C V C V",           (2,)),  # SYLLABER_1
+    ("C V C C V",         (3,)),  # SYLLABER_5
+    ("C V C C C C ]",     (6,)),  # SYLLABER_11
+    ("C V C C C C !]",    (5,)),  # SYLLABER_12
+    ("C V C C C V",       (4,)),  # SYLLABER_36
+    ("C V C C C ]",       (5,)),  # SYLLABER_120
+    ("C V C C C M ]",     (6,)),  # SYLLABER_330
+    ("C V C C ]",         (4,)),  # SYLLABER_52
+    ("C V C C M ]",       (5,)),  # SYLLABER_76
+    ("C V C C M C V",     (5,)),  # SYLLABER_250
+    ("C V C C M V",       (5,)),  # SYLLABER_260
+    ("C V C ]",           (3,)),  # SYLLABER_6
+    ("C V C M C !]",      (4,)),  # SYLLABER_13
+    ("C V C M C ]",       (5,)),  # SYLLABER_39
+    ("C V C M C C C ]",   (7,)),  # SYLLABER_350
+    ("C V C M ]",         (4,)),  # SYLLABER_14
+    ("C V C M V",         (4,)),  # SYLLABER_20
+    ("C V ]",             (2,)),  # SYLLABER_7
+    ("C V S C V",         (3,)),  # SYLLABER_8
+    ("C V S C C ]",       (5,)),  # SYLLABER_9
+    ("C V S C ]",         (4,)),  # SYLLABER_280
+    ("C V S C M ]",       (5,)),  # SYLLABER_400
+    ("C V S ]",           (3,)),  # SYLLABER_10
+    ("C V S",             (3,)),  # SYLLABER_64
+    ("C V V",             (2,)),  # SYLLABER_31
+    ("C C C V C C V",     (5,)),  # SYLLABER_2
+    ("C C C V C C M ]",   (7,)),  # SYLLABER_310
+    ("C C C V C ]",       (5,)),  # SYLLABER_3
+    ("C C C V C V",       (4,)),  # SYLLABER_4
+    ("C C C V C M C M ]", (8,)),  # SYLLABER_300
+    ("C C C V C M",       (6,)),  # SYLLABER_200
+    ("C C C V S",         (5,)),  # SYLLABER_54
+    ("C C C V V",         (4,)),  # SYLLABER_68
+    ("C C C V ]",         (4,)),  # SYLLABER_170
+    ("C C C V",           (4,)),  # SYLLABER_210
+    ("C C C C V S",       (6,)),  # SYLLABER_220
+    ("C C C C V",         (5,)),  # SYLLABER_98
+    ("C C V C C V",       (4,)),  # SYLLABER_15
+    ("C C V C C C C ]",   (7,)),  # SYLLABER_370
+    ("C C V C C C",       (5,)),  # SYLLABER_80
+    ("C C V C C M V",     (6,)),  # SYLLABER_340
+    ("C C V C C M C V",   (6,)),  # SYLLABER_390
+    ("C C V C C ]",       (5,)),  # SYLLABER_470
+    ("C C V C M !C",      (5,)),  # SYLLABER_21
+    ("C C V C M C V",     (5,)),  # SYLLABER_48
+    ("C C V C M C C V",   (5,)),  # SYLLABER_240
+    ("C C V C ]",         (4,)),  # SYLLABER_62
+    ("C C V C V",         (3,)),  # SYLLABER_230
+    ("C C V V C",         (3,)),  # SYLLABER_17
+    ("C C V V",           (3,)),  # SYLLABER_82
+    ("C C V S ]",         (4,)),  # SYLLABER_33
+    ("C C V S C V",       (4,)),  # SYLLABER_92
+    ("C C V S C C C ]",   (7,)),  # SYLLABER_450
+    ("C C V S",           (4,)),  # SYLLABER_190
+    ("C C V ]",           (3,)),  # SYLLABER_66
+    ("C C M V ]",         (4,)),  # SYLLABER_410
+    ("C C M V C V",       (4,)),  # SYLLABER_480
+    ("C M V C V",         (3,)),  # SYLLABER_16
+    ("C M V C C ]",       (5,)),  # SYLLABER_19
+    ("C M V C C V",       (4,)),  # SYLLABER_290
+    ("C M V C C C C V",   (6,)),  # SYLLABER_430
+    ("C M V C ]",         (4,)),  # SYLLABER_22
+    ("C M V ]",           (3,)),  # SYLLABER_94
+    ("C M C V S ]",       (5,)),  # SYLLABER_320
+    ("C M C V V",         (4,)),  # SYLLABER_360
+    ("V C C ]",           (3,)),  # SYLLABER_18
+    ("V C C V",           (2,)),  # SYLLABER_28
+    ("V C C C V C",       (3,)),  # SYLLABER_96
+    ("V C C C V",         (2,)),  # SYLLABER_50
+    ("V C C C C V",       (3,)),  # SYLLABER_460
+    ("V C C M ]",         (4,)),  # SYLLABER_72
+    ("V C V",             (1,)),  # SYLLABER_35
+    ("V C M ]",           (3,)),  # SYLLABER_40
+    ("V C M C C V",       (3,)),  # SYLLABER_42
+    ("V C M C V",         (3,)),  # SYLLABER_84
+    ("V C M V",           (3,)),  # SYLLABER_78
+    ("V C ]",             (2,)),  # SYLLABER_44
+    ("V C",               (2,)),  # SYLLABER_56
+    ("V ]",               (1,)),  # SYLLABER_30
+    ("V V",               (1,)),  # SYLLABER_34
+    ("V S ]",             (2,)),  # SYLLABER_46
+    ("V S C V",           (2,)),  # SYLLABER_180
+    ("[ C C V C ]",       (1, 4)),  # SYLLABER_23
+    ("[ C C V C C ]",     (1, 5)),  # SYLLABER_60
+    ("[ C C V C C M ]",   (1, 6)),  # SYLLABER_74
+    ("[ C C V S ]",       (1, 4)),  # SYLLABER_24
+    ("[ C C V ]",         (1, 3)),  # SYLLABER_27
+    ("[ C C ]",           (1, 2)),  # SYLLABER_70
+    ("[ C C C C V C ]",   (1, 6)),  # SYLLABER_88
+    ("[ C C C V C M ]",   (1, 6)),  # SYLLABER_90
+    ("[ C C C V ]",       (1, 4)),  # SYLLABER_140
+    ("[ C V C C M ]",     (1, 5)),  # SYLLABER_26
+    ("[ C V C C ]",       (1, 4)),  # SYLLABER_37
+    ("[ C V C M C C ]",   (1, 6)),  # SYLLABER_440
+    ("[ C V S C ]",       (1, 4)),  # SYLLABER_160
+    ("[ C ]",             (1, 1)),  # SYLLABER_32
+    ("[ C M C V ]",       (1, 4)),  # SYLLABER_58
+    ("[ C M C V C ]",     (1, 5)),  # SYLLABER_100
+    ("[ C M C V C V",     (1, 4)),  # SYLLABER_420
+    ("[ C M V ]",         (1, 3)),  # SYLLABER_86
+    ("[ C M V S ]",       (1, 4)),  # SYLLABER_110
+    ("[ C M V C M ]",     (1, 5)),  # SYLLABER_150
+    ("[ V C M ]",         (1, 3)),  # SYLLABER_25
+    ("[ V C ]",           (1, 2)),  # SYLLABER_29
+    ("[ V C C C C ]",     (1, 5)),  # SYLLABER_130
+    ("[ S V C V",         (1, 2)),  # SYLLABER_380
+]
+
+CLASSES = u"VCSM[]X"
+
+
+def char_class(c):
+    if V(c):
+        return u"V"
+    if C(c):
+        return u"C"
+    if S(c):
+        return u"S"
+    if M(c):
+        return u"M"
+    if BEG(c):
+        return u"["
+    if END(c):
+        return u"]"
+    return u"X"
+
+
+class ClassTable(dict):
+    """A str.translate table that maps every character to its class."""
+
+    def __missing__(self, code):
+        k = char_class(chr(code))
+        self[code] = k
+        return k
+
+
+CLASS_TABLE = ClassTable()
+
+
+def compile_rules(rules):
+    """Compiles the rules into a trie over character classes.
+
+    Every node is a dict from a class to the next node; the index of the first
+    rule that ends in a node is stored under the key None.
+    """
+    root = {}
+    for index, (pattern, lengths) in enumerate(rules):
+        nodes = [root]
+        for token in pattern.split():
+            if token.startswith(u"!"):
+                classes = [k for k in CLASSES if k != token[1:]]
+            else:
+                classes = [token]
+            nodes = [node.setdefault(k, {}) for node in nodes for k in classes]
+        for node in nodes:
+            if node.get(None) is None:
+                node[None] = index
+    return root
+
+
+TRIE = compile_rules(SYLLABER)
+DEPTH = max(len(pattern.split()) for pattern, lengths in SYLLABER)
+
+
+@functools.lru_cache(maxsize=None)
+def match(classes):
+    """Returns the syllable lengths of the first rule that matches the start
+    of the class string, or None. Only the first DEPTH classes are looked at,
+    so the callers pass a window of that size and the result is memoized."""
+    node = TRIE
+    best = None
+    for k in classes:
+        node = node.get(k)
+        if node is None:
+            break
+        index = node.get(None)
+        if index is not None and (best is None or index < best):
+            best = index
+    if best is None:
+        return None
+    return SYLLABER[best][1]
+
+
 def split(s):
+    chars = u"[" + s + u"]"
+    classes = chars.translate(CLASS_TABLE)
+    items = []
     cur_pos = 0
-    items = list(u"[" + s + u"]")
-    while cur_pos < len(items):
-        input_context = items[cur_pos:]
-        res = apply1(input_context)
-        if res is None:
+    while cur_pos < len(chars):
+        lengths = match(classes[cur_pos:cur_pos + DEPTH])
+        if lengths is None:
+            items.append(chars[cur_pos])
             cur_pos += 1
         else:
-            items = items[:cur_pos] + res[0] + input_context[res[1]:]
-            cur_pos += res[2]
+            for length in lengths:
+                items.append(chars[cur_pos:cur_pos + length])
+                cur_pos += length
     return items[1:-1]
 
 
-def apply1(s):
-        if C(s[0]):
-            if V(s[1]):
-                if C(s[2]):
-                    if V(s[3]):
-                        return ([s[0]+s[1], s[2], s[3]], 4, 1)  # SYLLABER_1
-
-                    if C(s[3]):
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_5
-
-                        if C(s[4]):
-                            if C(s[5]):
-                                if END(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 1)  # SYLLABER_11
-
-                                if not END(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5], s[6]], 7, 1)  # SYLLABER_12
-
-
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_36
-
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_120
-
-                            if M(s[5]):
-                                if END(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 1)  # SYLLABER_330
-
-
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_52
-
-                        if M(s[4]):
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_76
-
-                            if C(s[5]):
-                                if V(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5], s[6]], 7, 1)  # SYLLABER_250
-
-
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_260
-
-
-
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_6
-
-                    if M(s[3]):
-                        if C(s[4]):
-                            if not END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_13
-
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_39
-
-                            if C(s[5]):
-                                if C(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 1)  # SYLLABER_350
-
-
-
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_14
-
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_20
-
-
-
-                if END(s[2]):
-                    return ([s[0]+s[1], s[2]], 3, 1)  # SYLLABER_7
-
-                if S(s[2]):
-                    if C(s[3]):
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_8
-
-                        if C(s[4]):
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_9
-
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_280
-
-                        if M(s[4]):
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_400
-
-
-
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_10
-
-                    return ([s[0]+s[1]+s[2]], 3, 1)  # SYLLABER_64
-
-                if V(s[2]):
-                    return ([s[0]+s[1], s[2]], 3, 1)  # SYLLABER_31
-
-
-            if C(s[1]):
-                if C(s[2]):
-                    if V(s[3]):
-                        if C(s[4]):
-                            if C(s[5]):
-                                if V(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5], s[6]], 7, 1)  # SYLLABER_2
-
-                                if M(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 1)  # SYLLABER_310
-
-
-
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_3
-
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_4
-
-                            if M(s[5]):
-                                if C(s[6]):
-                                    if M(s[7]):
-                                        if END(s[8]):
-                                            return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]+s[6]+s[7], s[8]], 9, 1)  # SYLLABER_300
-
-
-
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]], 6, 1)  # SYLLABER_200
-
-
-                        if S(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3]+s[4]], 5, 1)  # SYLLABER_54
-
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_68
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_170
-
-                        return ([s[0]+s[1]+s[2]+s[3]], 4, 1)  # SYLLABER_210
-
-                    if C(s[3]):
-                        if V(s[4]):
-                            if S(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]], 6, 1)  # SYLLABER_220
-
-                            return ([s[0]+s[1]+s[2]+s[3]+s[4]], 5, 1)  # SYLLABER_98
-
-
-
-                if V(s[2]):
-                    if C(s[3]):
-                        if C(s[4]):
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_15
-
-                            if C(s[5]):
-                                if C(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 1)  # SYLLABER_370
-
-
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_80
-
-                            if M(s[5]):
-                                if V(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 1)  # SYLLABER_340
-
-                                if C(s[6]):
-                                    if V(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5], s[6], s[7]], 8, 1)  # SYLLABER_390
-
-
-
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_470
-
-
-                        if M(s[4]):
-                            if not C(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_21
-
-                            if C(s[5]):
-                                if V(s[6]):
-                                    return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5], s[6]], 7, 1)  # SYLLABER_48
-
-                                if C(s[6]):
-                                    if V(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5], s[6], s[7]], 8, 1)  # SYLLABER_240
-
-
-
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_62
-
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_230
-
-
-                    if V(s[3]):
-                        if C(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_17
-
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_82
-
-                    if S(s[3]):
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_33
-
-                        if C(s[4]):
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_92
-
-                            if C(s[5]):
-                                if C(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 1)  # SYLLABER_450
-
-
-
-
-                        return ([s[0]+s[1]+s[2]+s[3]], 4, 1)  # SYLLABER_190
-
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_66
-
-
-                if M(s[2]):
-                    if V(s[3]):
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_410
-
-                        if C(s[4]):
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_480
-
-
-
-
-
-            if M(s[1]):
-                if V(s[2]):
-                    if C(s[3]):
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_16
-
-                        if C(s[4]):
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_19
-
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3], s[4], s[5]], 6, 1)  # SYLLABER_290
-
-                            if C(s[5]):
-                                if C(s[6]):
-                                    if V(s[7]):
-                                        return ([s[0]+s[1]+s[2]+s[3]+s[4]+s[5], s[6], s[7]], 8, 1)  # SYLLABER_430
-
-
-
-
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_22
-
-
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_94
-
-
-                if C(s[2]):
-                    if V(s[3]):
-                        if S(s[4]):
-                            if END(s[5]):
-                                return ([s[0]+s[1]+s[2]+s[3]+s[4], s[5]], 6, 1)  # SYLLABER_320
-
-
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_360
-
-
-
-
-
-
-        if V(s[0]):
-            if C(s[1]):
-                if C(s[2]):
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_18
-
-                    if V(s[3]):
-                        return ([s[0]+s[1], s[2], s[3]], 4, 1)  # SYLLABER_28
-
-                    if C(s[3]):
-                        if V(s[4]):
-                            if C(s[5]):
-                                return ([s[0]+s[1]+s[2], s[3], s[4], s[5]], 6, 1)  # SYLLABER_96
-
-                            return ([s[0]+s[1], s[2], s[3], s[4]], 5, 1)  # SYLLABER_50
-
-                        if C(s[4]):
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2], s[3], s[4], s[5]], 6, 1)  # SYLLABER_460
-
-
-
-                    if M(s[3]):
-                        if END(s[4]):
-                            return ([s[0]+s[1]+s[2]+s[3], s[4]], 5, 1)  # SYLLABER_72
-
-
-
-                if V(s[2]):
-                    return ([s[0], s[1], s[2]], 3, 1)  # SYLLABER_35
-
-                if M(s[2]):
-                    if END(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_40
-
-                    if C(s[3]):
-                        if C(s[4]):
-                            if V(s[5]):
-                                return ([s[0]+s[1]+s[2], s[3], s[4], s[5]], 6, 1)  # SYLLABER_42
-
-
-                        if V(s[4]):
-                            return ([s[0]+s[1]+s[2], s[3], s[4]], 5, 1)  # SYLLABER_84
-
-
-                    if V(s[3]):
-                        return ([s[0]+s[1]+s[2], s[3]], 4, 1)  # SYLLABER_78
-
-
-                if END(s[2]):
-                    return ([s[0]+s[1], s[2]], 3, 1)  # SYLLABER_44
-
-                return ([s[0]+s[1]], 2, 1)  # SYLLABER_56
-
-            if END(s[1]):
-                return ([s[0], s[1]], 2, 1)  # SYLLABER_30
-
-            if V(s[1]):
-                return ([s[0], s[1]], 2, 1)  # SYLLABER_34
-
-            if S(s[1]):
-                if END(s[2]):
-                    return ([s[0]+s[1], s[2]], 3, 1)  # SYLLABER_46
-
-                if C(s[2]):
-                    if V(s[3]):
-                        return ([s[0]+s[1], s[2], s[3]], 4, 1)  # SYLLABER_180
-
-
-
-
-
-        if BEG(s[0]):
-            if C(s[1]):
-                if C(s[2]):
-                    if V(s[3]):
-                        if C(s[4]):
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_23
-
-                            if C(s[5]):
-                                if END(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 2)  # SYLLABER_60
-
-                                if M(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 2)  # SYLLABER_74
-
-
-
-
-                        if S(s[4]):
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_24
-
-
-                        if END(s[4]):
-                            return ([s[0], s[1]+s[2]+s[3], s[4]], 5, 2)  # SYLLABER_27
-
-
-                    if END(s[3]):
-                        return ([s[0], s[1]+s[2], s[3]], 4, 2)  # SYLLABER_70
-
-                    if C(s[3]):
-                        if C(s[4]):
-                            if V(s[5]):
-                                if C(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 2)  # SYLLABER_88
-
-
-
-
-                        if V(s[4]):
-                            if C(s[5]):
-                                if M(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 2)  # SYLLABER_90
-
-
-
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_140
-
-
-
-
-                if V(s[2]):
-                    if C(s[3]):
-                        if C(s[4]):
-                            if M(s[5]):
-                                if END(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 2)  # SYLLABER_26
-
-
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_37
-
-
-                        if M(s[4]):
-                            if C(s[5]):
-                                if C(s[6]):
-                                    if END(s[7]):
-                                        return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5]+s[6], s[7]], 8, 2)  # SYLLABER_440
-
-
-
-
-
-                    if S(s[3]):
-                        if C(s[4]):
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_160
-
-
-
-
-                if END(s[2]):
-                    return ([s[0], s[1], s[2]], 3, 2)  # SYLLABER_32
-
-                if M(s[2]):
-                    if C(s[3]):
-                        if V(s[4]):
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_58
-
-                            if C(s[5]):
-                                if END(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 2)  # SYLLABER_100
-
-                                if V(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4], s[5], s[6]], 7, 2)  # SYLLABER_420
-
-
-
-
-                    if V(s[3]):
-                        if END(s[4]):
-                            return ([s[0], s[1]+s[2]+s[3], s[4]], 5, 2)  # SYLLABER_86
-
-                        if S(s[4]):
-                            if END(s[5]):
-                                return ([s[0], s[1]+s[2]+s[3]+s[4], s[5]], 6, 2)  # SYLLABER_110
-
-
-                        if C(s[4]):
-                            if M(s[5]):
-                                if END(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 2)  # SYLLABER_150
-
-
-
-
-
-
-            if V(s[1]):
-                if C(s[2]):
-                    if M(s[3]):
-                        if END(s[4]):
-                            return ([s[0], s[1]+s[2]+s[3], s[4]], 5, 2)  # SYLLABER_25
-
-
-                    if END(s[3]):
-                        return ([s[0], s[1]+s[2], s[3]], 4, 2)  # SYLLABER_29
-
-                    if C(s[3]):
-                        if C(s[4]):
-                            if C(s[5]):
-                                if END(s[6]):
-                                    return ([s[0], s[1]+s[2]+s[3]+s[4]+s[5], s[6]], 7, 2)  # SYLLABER_130
-
-
-
-
-
-
-            if S(s[1]):
-                if V(s[2]):
-                    if C(s[3]):
-                        if V(s[4]):
-                            return ([s[0], s[1]+s[2], s[3], s[4]], 5, 2)  # SYLLABER_380
-
-
-
-
-
-
 if __name__ == "__main__":
     sx = split(u"бідність")
     print(u"|".join(sx))
 
+
+@functools.lru_cache(maxsize=1 << 17)
+def _split_cached(word):
+    return tuple(split(word))
+
+
 def split_word(word):
-    return split(word)
+    return list(_split_cached(word))
 
 
 def split_words(words):
     tokens = []
     for word in words:
-        sx = split(word)
+        sx = split_word(word)
         if len(tokens) > 0:
             tokens.append(u' ')
         tokens.extend(sx)
     return tokens
+
+
+# Syllables of many words in CSR layout: the syllables of word i are
+# syllables[ids[k]] for k in range(offsets[i], offsets[i + 1]).
+SyllableBatch = collections.namedtuple("SyllableBatch", ["ids", "offsets", "syllables"])
+
+
+def split_batch(words):
+    """Splits every word into syllables and interns the syllables.
+
+    Returns a SyllableBatch with a flat array of syllable IDs, an array of
+    word offsets into it and the syllable inventory (the index of a syllable
+    is its ID). The splits go through the memo of split_word, so repeated
+    words are syllabified once.
+    """
+    index = {}
+    ids = array("I")
+    offsets = array("I", [0])
+    for word in words:
+        for syllable in _split_cached(word):
+            sid = index.get(syllable)
+            if sid is None:
+                sid = index[syllable] = len(index)
+            ids.append(sid)
+        offsets.append(len(ids))
+    return SyllableBatch(ids, offsets, list(index))